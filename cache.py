@@ -0,0 +1,83 @@
+import os, pickle, hashlib
+from dataclasses import fields
+from types import MappingProxyType
+from typing import Dict
+import process_data, option_table
+from process_data import INDEX_DEPTHS, Data, ProcessData, freeze_index
+
+"""
+On disk cache of ProcessData output.
+
+Most runs only change the constraints passed to run_main, so processing the same
+course_data again is wasted time. The cache file is named after a sha256 of the raw
+course_data (plus the source of process_data.py and option_table.py so
+changing the preprocessing also invalidates it). A changed dataset gets a new key, so stale entries are simply never read.
+"""
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "process_data")
+
+
+def dataset_hash(course_data: Dict) -> str:
+    digest = hashlib.sha256()
+    for module in (process_data, option_table):
+        with open(module.__file__, "rb") as f:
+            digest.update(f.read())
+
+    # sets have no stable order between runs so everything is sorted before hashing,
+    # section order is kept because it decides the order literals are assigned in.
+    for section, values in course_data.items():
+        digest.update(repr((
+            section,
+            sorted(values["room_times"]),
+            sorted(values["hard"]),
+            sorted(values["soft"].items()),
+        )).encode())
+    return digest.hexdigest()
+
+
+def save_data(data: Data, path: str) -> None:
+    # MappingProxyType can't be pickled, store the plain dicts it wraps
+    state = {}
+    for f in fields(Data):
+        value = getattr(data, f.name)
+        state[f.name] = _plain(value)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def load_data(path: str) -> Data:
+    with open(path, "rb") as f:
+        state = pickle.load(f)
+    return Data(**{
+        name: freeze_index(value, INDEX_DEPTHS.get(name, 0)) if isinstance(value, dict) else value
+        for name, value in state.items()
+    })
+
+
+def _plain(value):
+    # room_time_literals holds a MappingProxyType per room
+    if isinstance(value, MappingProxyType):
+        return {key: _plain(inner) for key, inner in value.items()}
+    return value
+
+
+def cached_process_data(course_data: Dict, cache_dir: str = CACHE_DIR, prune: bool = False) -> Data:
+    """Return the processed Data for course_data, only running ProcessData on a cache miss."""
+    # pruning changes the literals, so pruned Data gets its own file
+    name = dataset_hash(course_data) + ("-pruned" if prune else "")
+    path = os.path.join(cache_dir, name + ".pickle")
+    if os.path.exists(path):
+        try:
+            return load_data(path)
+        except (OSError, EOFError, pickle.UnpicklingError, TypeError) as e:
+            print(f"ignoring unreadable cache file {path}: {e}")
+
+    pd = ProcessData(course_data, prune=prune)
+    pd.process_data()
+    data = pd.get_data()
+    save_data(data, path)
+    return data
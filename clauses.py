@@ -0,0 +1,108 @@
+from array import array
+from typing import Iterable, Iterator, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, dedupe falls back to a dict of tuples without it
+    np = None
+
+"""
+Flat clause storage for the Encoder in main.py.
+
+Every clause used to be a tuple in a set, ~100 bytes each and two set lookups per clause.
+ClauseArena keeps all literals of all clauses in one int32 array, clause i is
+
+    literals[offsets[i]:offsets[i + 1]]
+
+so adding a clause only appends a few ints. Duplicates are allowed in while a phase runs and
+removed in bulk by dedupe() afterwards: literals inside a clause are sorted, then the clauses
+themselves are sorted and made unique. (-3, -5) and (-5, -3) are the same clause and now only
+written once, and the CNF comes out in the same order every run.
+"""
+
+
+class ClauseArena:
+    def __init__(self):
+        self.literals = array("i")
+        self.offsets = array("q", [0])
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __iter__(self) -> Iterator[Tuple[int, ...]]:
+        literals, offsets = self.literals, self.offsets
+        for i in range(len(offsets) - 1):
+            yield tuple(literals[offsets[i] : offsets[i + 1]])
+
+    @property
+    def nbytes(self) -> int:
+        return self.literals.itemsize * len(self.literals) + self.offsets.itemsize * len(self.offsets)
+
+    def append(self, clause: Iterable[int]) -> None:
+        self.literals.extend(clause)
+        self.offsets.append(len(self.literals))
+
+    def exclusive(self, literals1: Sequence[int], literals2: Sequence[int] = None, aux: int = None) -> None:
+        """(-i, -j) for every i in literals1 and j in literals2, with aux added when given.
+        Without literals2 every pair inside literals1 once. i == j is always skipped"""
+        literals, offsets = self.literals, self.offsets
+        append, end = literals.append, offsets.append
+        for index, i in enumerate(literals1):
+            for j in (literals1[index + 1 :] if literals2 is None else literals2):
+                if i == j:
+                    continue
+                append(-i)
+                append(-j)
+                if aux is not None:
+                    append(aux)
+                end(len(literals))
+
+    def pairs(self, literals1, literals2) -> None:
+        """(-literals1[i], -literals2[i]) for every i, from two numpy arrays in one go."""
+        count = len(literals1)
+        clauses = np.empty((count, 2), dtype=np.int32)
+        clauses[:, 0] = literals1
+        clauses[:, 1] = literals2
+        np.negative(clauses, out=clauses)
+        ends = self.offsets[-1]
+        self.literals.frombytes(clauses.tobytes())
+        self.offsets.frombytes((ends + 2 * np.arange(1, count + 1, dtype=np.int64)).tobytes())
+
+    def dedupe(self) -> None:
+        if len(self) < 2:
+            return
+        if np is None:
+            # shortest clauses first, the same order as the numpy path below
+            unique = sorted(dict.fromkeys(tuple(sorted(clause)) for clause in self), key=lambda clause: (len(clause), clause))
+            self.literals, self.offsets = array("i"), array("q", [0])
+            for clause in unique:
+                self.append(clause)
+            return
+
+        literals = np.frombuffer(self.literals, dtype=np.int32)
+        offsets = np.frombuffer(self.offsets, dtype=np.int64)
+        lengths = np.diff(offsets)
+        # one 2d block per clause length, sorted within each row and then row wise
+        blocks = []
+        for length in np.unique(lengths).tolist():
+            starts = offsets[:-1][lengths == length]
+            rows = literals[starts[:, None] + np.arange(length)]
+            rows.sort(axis=1)
+            blocks.append((length, np.unique(rows, axis=0)))
+
+        self.literals = array("i")
+        self.offsets = array("q", [0])
+        for length, rows in blocks:
+            self.literals.frombytes(rows.astype(np.int32).tobytes())
+            ends = self.offsets[-1]
+            self.offsets.frombytes(
+                (ends + length * np.arange(1, len(rows) + 1, dtype=np.int64)).tobytes())
+
+    def write(self, f, chunk_size: int = 65536) -> None:
+        buffer = []
+        for clause in self:
+            buffer.append(" ".join(map(str, clause)) + " 0\n")
+            if len(buffer) >= chunk_size:
+                f.write("".join(buffer))
+                buffer.clear()
+        f.write("".join(buffer))
@@ -0,0 +1,254 @@
+import mmap, struct, sys, os, importlib, importlib.util
+from array import array
+from typing import Dict, List
+
+"""
+Compiled dataset format.
+
+Importing datasets/cset.py makes python compile a 27k line dict literal on every cold start.
+This module converts any `course_data` module into a flat binary file that can be mmap'd
+and turned back into the same `course_data` dict in a few milliseconds.
+
+layout (little endian, every field is an int32 so the whole file is 4 byte aligned):
+    header:     magic, version, and the counts of everything below
+    strings:    sections, rooms and day patterns ("MWF", "TR" ...) as interned string tables.
+                each table is an offsets array (count + 1) followed by a utf-8 blob padded to 4 bytes.
+    options:    one fixed width column per field, one row per room_times entry,
+                rows are grouped by section so section_offsets[s]:section_offsets[s+1] are its options.
+                    section, room, days, start (HHMM like in the time string), duration (minutes), weight
+    hard:       CSR adjacency. hard_offsets (sections + 1) and hard_targets
+    soft:       CSR adjacency. soft_offsets (sections + 1), soft_targets and soft_pts
+
+convert a module with:
+    python -m datasets.compiled datasets.cset
+which writes datasets/cset.cdat next to the module.
+"""
+
+MAGIC = b"CDAT"
+VERSION = 1
+EXTENSION = ".cdat"
+
+# magic, version, defined sections, sections, rooms, days, options, hard edges, soft edges, blob sizes (x3)
+HEADER = struct.Struct("<4s11i")
+OPTION_COLUMNS = ("section", "room", "days", "start", "duration", "weight")
+
+
+def split_time(time: str):
+    # "MWF0900+50" -> ("MWF", 900, 50), the inverse of join_time
+    x = time.index("+")
+    return time[: x - 4], int(time[x - 4 : x]), int(time[x + 1 :])
+
+
+def join_time(days: str, start: int, duration: int) -> str:
+    return f"{days}{start:04d}+{duration}"
+
+
+def _pack_strings(strings: List[str]):
+    offsets = array("i", [0])
+    blob = bytearray()
+    for string in strings:
+        blob += string.encode()
+        offsets.append(len(blob))
+    blob += b"\0" * (-len(blob) % 4)
+    return offsets, bytes(blob)
+
+
+def compile_course_data(course_data: Dict, path: str) -> None:
+    sections = list(course_data.keys())
+    section_ids = {section: i for i, section in enumerate(sections)}
+
+    # sections that are only referenced by hard/soft edges still need a name
+    for values in course_data.values():
+        for other in list(values["hard"]) + list(values["soft"]):
+            if other not in section_ids:
+                section_ids[other] = len(sections)
+                sections.append(other)
+
+    rooms: Dict[str, int] = {}
+    days: Dict[str, int] = {}
+    columns = {name: array("i") for name in OPTION_COLUMNS}
+    section_offsets = array("i", [0])
+    hard_offsets, hard_targets = array("i", [0]), array("i")
+    soft_offsets, soft_targets, soft_pts = array("i", [0]), array("i"), array("i")
+
+    for section in sections:
+        values = course_data.get(section, {"room_times": (), "hard": (), "soft": {}})
+        for room, time, weight in values["room_times"]:
+            day, start, duration = split_time(time)
+            if join_time(day, start, duration) != time:
+                raise ValueError(f"{section}: time {time!r} does not round trip through the compiled format")
+            columns["section"].append(section_ids[section])
+            columns["room"].append(rooms.setdefault(room, len(rooms)))
+            columns["days"].append(days.setdefault(day, len(days)))
+            columns["start"].append(start)
+            columns["duration"].append(duration)
+            columns["weight"].append(weight)
+        section_offsets.append(len(columns["section"]))
+
+        hard_targets.extend(section_ids[other] for other in values["hard"])
+        hard_offsets.append(len(hard_targets))
+        for other, pts in values["soft"].items():
+            soft_targets.append(section_ids[other])
+            soft_pts.append(pts)
+        soft_offsets.append(len(soft_targets))
+
+    tables = [_pack_strings(strings) for strings in (sections, list(rooms), list(days))]
+    header = HEADER.pack(
+        MAGIC, VERSION,
+        # sections only referenced by an edge come after the ones with room_times
+        len(course_data), len(sections), len(rooms), len(days), len(columns["section"]),
+        len(hard_targets), len(soft_targets),
+        *(len(blob) for _, blob in tables),
+    )
+    arrays = [offsets for offsets, _ in tables]
+    arrays += [columns[name] for name in OPTION_COLUMNS]
+    arrays += [section_offsets, hard_offsets, hard_targets, soft_offsets, soft_targets, soft_pts]
+
+    if sys.byteorder != "little":
+        for arr in arrays:
+            arr.byteswap()
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        for offsets, (_, blob) in zip(arrays[:3], tables):
+            f.write(offsets.tobytes())
+            f.write(blob)
+        for arr in arrays[3:]:
+            f.write(arr.tobytes())
+    os.replace(tmp_path, path)
+
+
+class CompiledDataset:
+    """Read only view over a .cdat file.
+    The columns are memoryviews straight into the mmap, nothing is copied until
+    course_data() materialises the dictionary ProcessData expects.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+
+        magic, version, self.num_defined, n_sections, n_rooms, n_days, n_options, n_hard, n_soft, *blob_sizes = (
+            HEADER.unpack_from(buffer))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} compiled dataset")
+
+        self._position = HEADER.size
+        self._buffer = buffer
+        self.sections = self._strings(n_sections, blob_sizes[0])
+        self.rooms = self._strings(n_rooms, blob_sizes[1])
+        self.days = self._strings(n_days, blob_sizes[2])
+
+        self.columns = {name: self._ints(n_options) for name in OPTION_COLUMNS}
+        self.section_offsets = self._ints(n_sections + 1)
+        self.hard_offsets = self._ints(n_sections + 1)
+        self.hard_targets = self._ints(n_hard)
+        self.soft_offsets = self._ints(n_sections + 1)
+        self.soft_targets = self._ints(n_soft)
+        self.soft_pts = self._ints(n_soft)
+
+    def _ints(self, count: int):
+        start, self._position = self._position, self._position + count * 4
+        raw = self._buffer[start : self._position]
+        if sys.byteorder == "little":
+            return raw.cast("i")
+        values = array("i", raw.tobytes())
+        values.byteswap()
+        return values
+
+    def _strings(self, count: int, size: int) -> List[str]:
+        offsets = self._ints(count + 1).tolist()
+        start, self._position = self._position, self._position + size
+        blob = bytes(self._buffer[start : start + offsets[-1]]).decode()
+        # offsets are byte offsets, so only slice the str directly when it is pure ascii
+        if len(blob) != offsets[-1]:
+            data = blob.encode()
+            return [data[a:b].decode() for a, b in zip(offsets, offsets[1:])]
+        return [blob[a:b] for a, b in zip(offsets, offsets[1:])]
+
+    def course_data(self) -> Dict:
+        sections, rooms, days = self.sections, self.rooms, self.days
+        section_offsets = self.section_offsets.tolist()
+        hard_offsets, hard_targets = self.hard_offsets.tolist(), self.hard_targets.tolist()
+        soft_offsets = self.soft_offsets.tolist()
+        soft_targets, soft_pts = self.soft_targets.tolist(), self.soft_pts.tolist()
+        room_column = self.columns["room"].tolist()
+        weight_column = self.columns["weight"].tolist()
+        time_columns = zip(
+            self.columns["days"].tolist(),
+            self.columns["start"].tolist(),
+            self.columns["duration"].tolist(),
+        )
+
+        # the same time string is shared by hundreds of options, only format it once
+        time_strings: Dict[tuple, str] = {}
+        times = []
+        for key in time_columns:
+            time = time_strings.get(key)
+            if time is None:
+                time = time_strings[key] = join_time(days[key[0]], key[1], key[2])
+            times.append(time)
+
+        course_data = {}
+        for i in range(self.num_defined):
+            a, b = section_offsets[i], section_offsets[i + 1]
+            course_data[sections[i]] = {
+                "room_times": {
+                    (rooms[room_column[j]], times[j], weight_column[j]) for j in range(a, b)
+                },
+                "hard": {sections[j] for j in hard_targets[hard_offsets[i] : hard_offsets[i + 1]]},
+                "soft": {
+                    sections[j]: pts
+                    for j, pts in zip(
+                        soft_targets[soft_offsets[i] : soft_offsets[i + 1]],
+                        soft_pts[soft_offsets[i] : soft_offsets[i + 1]],
+                    )
+                },
+            }
+        return course_data
+
+
+def compiled_path(module_name: str) -> str:
+    # next to the module source: "datasets.cset" -> "<repo>/datasets/cset.cdat", "pkg.cset" -> "<pkg>/cset.cdat"
+    try:
+        spec = importlib.util.find_spec(module_name)
+    except ModuleNotFoundError:  # the parent package doesn't exist either
+        spec = None
+    if spec is not None and spec.origin is not None:
+        return os.path.splitext(spec.origin)[0] + EXTENSION
+    # no source left, only a compiled file. look where the source would be
+    return os.path.abspath(os.path.join(*module_name.split("."))) + EXTENSION
+
+
+def fresh_compiled_path(module_name: str):
+    # the compiled file, or None when it is missing or older than the module source
+    path = compiled_path(module_name)
+    source = path[: -len(EXTENSION)] + ".py"
+    if os.path.exists(path) and (
+        not os.path.exists(source) or os.path.getmtime(path) >= os.path.getmtime(source)
+    ):
+        return path
+    return None
+
+
+def load_course_data(module_name: str) -> Dict:
+    """Load `course_data` for a dataset module, preferring the compiled file
+    when it exists and is newer than the module source."""
+    path = fresh_compiled_path(module_name)
+    if path:
+        return CompiledDataset(path).course_data()
+
+    module = importlib.import_module(module_name)
+    importlib.reload(module)
+    return module.course_data
+
+
+if __name__ == "__main__":
+    # python -m datasets.compiled datasets.cset [datasets.cs ...]
+    for name in sys.argv[1:] or ["datasets.cs", "datasets.cset"]:
+        module = importlib.import_module(name)
+        path = compiled_path(name)
+        compile_course_data(module.course_data, path)
+        print(f"{name} -> {path} ({os.path.getsize(path)} bytes)")
@@ -0,0 +1,232 @@
+import random, sys
+from collections import Counter
+from typing import Dict, List
+
+"""
+Synthetic datasets shaped like datasets/cset.py.
+
+generate_course_data(scale, seed) builds a course_data dict with round(463 * scale) sections.
+The tables below were measured on cset.py so the generated data has the same
+day patterns, rooms and times per section (drawn together, sections with many rooms also
+have many times), rooms per building, hard edge degree and soft conflict tiers. The same scale and seed always give the same dataset.
+
+    python -m datasets.generate 10 datasets/cset10.cdat [seed]
+
+writes a compiled (.cdat) or streamed (.jsonl / .csv) file, see datasets/compiled.py and datasets/stream.py.
+"""
+
+BASE_SECTIONS = 463
+SCALES = (1, 10, 100)
+
+# department -> number of sections in cset
+DEPARTMENTS = {
+    "BIOL": 147, "MATH": 70, "CHEM": 66, "MECH": 30, "PHYS": 25, "CS": 24, "ENVS": 19, "GEO": 19,
+    "ECE": 15, "IT": 14, "GEOG": 12, "SE": 10, "BTEC": 8, "MTRN": 2, "SCI": 2,
+}
+# building -> rooms
+BUILDINGS = {"SET": 37, "SNOW": 15, "Smith": 7, "HCC": 1, "BROWN": 1, "COE": 1}
+
+# (rooms, times) -> number of cset sections with that many rooms and times, every option is a room x time.
+# the two are correlated (r = 0.36), drawing them separately loses most of the 100+ option sections
+ROOMS_TIMES = {
+    (1, 1): 73, (1, 2): 31, (1, 3): 26, (1, 4): 44, (1, 5): 37, (1, 6): 1, (1, 7): 1, (1, 8): 1, (1, 9): 2,
+    (1, 11): 25, (1, 12): 15, (1, 13): 4, (1, 15): 2, (1, 17): 1, (1, 20): 4, (1, 24): 2, (1, 29): 1, (1, 35): 4,
+    (2, 4): 2, (2, 12): 1, (3, 1): 3, (3, 4): 2, (3, 5): 5, (3, 6): 5, (3, 8): 1, (3, 9): 2,
+    (4, 1): 7, (4, 3): 2, (4, 4): 2, (4, 11): 12, (4, 12): 3, (4, 16): 1, (4, 20): 2, (4, 24): 2, (4, 29): 3,
+    (4, 35): 3, (4, 40): 1, (5, 3): 1,
+    (9, 1): 17, (9, 2): 10, (9, 3): 1, (9, 4): 1, (9, 6): 3, (9, 11): 10, (9, 12): 8, (9, 16): 2, (9, 24): 9,
+    (9, 29): 10, (10, 1): 7, (10, 2): 1, (10, 3): 2, (10, 4): 1, (10, 5): 1, (10, 7): 1, (10, 11): 9, (10, 12): 1,
+    (10, 13): 1, (10, 16): 3, (10, 20): 4, (10, 24): 2, (10, 29): 4, (10, 35): 3, (10, 40): 3,
+    (11, 1): 3, (11, 2): 1, (11, 5): 2, (11, 11): 3, (11, 12): 1, (11, 13): 2, (11, 16): 3,
+}
+
+# every cset section draws its times from one of these families.
+# (sections, [(day patterns, duration in minutes, start times HHMM), ...], times per section)
+# the family is picked after the number of times, weighted by how often it has that many
+LECTURE_STARTS = (730, 900, 1030, 1200, 1330, 1500, 1630)
+HOURLY_STARTS = (800, 900, 1000, 1100, 1200, 1300, 1400, 1500)
+TIME_PROFILES = [
+    (214, [(("MWF",), 50, HOURLY_STARTS[:5]), (("MW", "TR"), 75, LECTURE_STARTS), (("MW", "TR"), 100, (1300, 1500))],
+        {1: 35, 2: 13, 3: 4, 4: 13, 5: 31, 6: 9, 7: 2, 8: 1, 9: 3, 11: 57, 12: 29, 13: 7, 16: 9, 17: 1}),
+    (189, [(("M", "T", "W", "R", "F"), 50, HOURLY_STARTS), (("M", "T", "W", "R", "F"), 110, HOURLY_STARTS[::2]),
+        (("M", "T", "W", "R", "F"), 170, (800, 1100, 1400, 1800))],
+        {1: 70, 2: 30, 3: 23, 4: 36, 5: 11, 11: 2, 15: 2, 20: 7, 35: 8}),
+    (54, [(("MTWR", "MTWF", "MTRF", "MWRF", "TWRF"), 50, HOURLY_STARTS), (("MW", "TR"), 75, LECTURE_STARTS[1:5])],
+        {1: 1, 3: 3, 4: 3, 5: 3, 8: 1, 9: 1, 20: 3, 24: 15, 29: 18, 35: 2, 40: 4}),
+    (6, [(("MWF",), 50, HOURLY_STARTS[:5])], {1: 4, 3: 2}),
+]
+# sections outside their department's home building, the one room buildings only show up this way
+OTHER_BUILDING = 0.2
+HARD_DEGREE = {0: 146, 1: 53, 2: 64, 3: 101, 4: 48, 5: 25, 6: 17, 7: 3, 8: 4, 9: 1, 11: 1}
+HARD_SAME_DEPARTMENT = 866 / 976
+# 140 of 463 sections have soft edges, this is the degree of those that do
+SOFT_SECTIONS = 140 / 463
+SOFT_DEGREE = {
+    3: 1, 4: 2, 6: 1, 7: 3, 8: 1, 9: 12, 10: 2, 11: 3, 12: 2, 13: 5, 14: 7, 15: 3, 16: 4, 17: 10,
+    18: 3, 19: 3, 20: 4, 21: 6, 22: 6, 23: 1, 24: 4, 25: 3, 26: 2, 27: 4, 29: 3, 30: 4, 31: 6,
+    32: 1, 33: 1, 34: 1, 35: 2, 36: 6, 38: 1, 40: 1, 41: 2, 43: 1, 44: 2, 45: 1, 46: 1, 48: 1,
+    49: 2, 51: 1, 55: 2, 56: 1, 59: 3, 62: 3, 66: 1, 77: 1,
+}
+SOFT_SAME_DEPARTMENT = 955 / 3505
+SOFT_TIERS = {32: 1608, 99: 792, 30: 755, 45: 318, 60: 32}
+OPTION_WEIGHTS = {0: 19115, 10: 83, 11: 45, 1: 39, 5: 27, 21: 15, 20: 10, 15: 9}
+
+
+class Sampler:
+    """Draws values from one of the {value: count} tables above."""
+
+    def __init__(self, rng: random.Random, table: Dict):
+        self.rng = rng
+        self.values = list(table.keys())
+        self.weights = list(table.values())
+
+    def __call__(self, k: int = None):
+        if k is None:
+            return self.rng.choices(self.values, self.weights)[0]
+        return self.rng.choices(self.values, self.weights, k=k)
+
+
+def _copy_name(name: str, copy: int) -> str:
+    # the first copy keeps the real name, "BIOL", "BIOL2", "BIOL3" ...
+    return name if copy == 0 else f"{name}{copy + 1}"
+
+
+def _link(rng, need: Dict[str, int], sections: List[str], department_of: Dict[str, str],
+          same_department: float, edges: Dict[str, Dict[str, int]], value_of) -> None:
+    # stub matching: every section asks for need[section] edges,
+    # partners come from its own department with probability same_department
+    by_department: Dict[str, List[str]] = {}
+    for section in sections:
+        if need[section]:
+            by_department.setdefault(department_of[section], []).append(section)
+    everyone = [section for section in sections if need[section]]
+
+    order = list(everyone)
+    rng.shuffle(order)
+    for section in order:
+        tries = 0
+        while need[section] > 0 and tries < 4 * need[section] + 8:
+            tries += 1
+            pool = by_department[department_of[section]] if rng.random() < same_department else everyone
+            if not pool:
+                continue
+            i = rng.randrange(len(pool))
+            other = pool[i]
+            if need[other] <= 0:
+                # lazily drop sections that are already full
+                pool[i] = pool[-1]
+                pool.pop()
+                continue
+            if other == section or other in edges[section]:
+                continue
+            value = value_of()
+            edges[section][other] = value
+            edges[other][section] = value
+            need[section] -= 1
+            need[other] -= 1
+
+
+def generate_course_data(scale: float = 1, seed: int = 0) -> Dict:
+    rng = random.Random(f"{scale}:{seed}")
+    num_sections = max(2, round(BASE_SECTIONS * scale))
+    copies = max(1, -(-num_sections // BASE_SECTIONS))
+
+    # departments and buildings grow with the dataset so each stays the size it is in cset
+    department_weights = {}
+    department_building = {}
+    building_weights = {_copy_name(b, c): n for c in range(copies) for b, n in BUILDINGS.items()}
+    for copy in range(copies):
+        buildings = [_copy_name(b, copy) for b in BUILDINGS]
+        for name, count in DEPARTMENTS.items():
+            department = _copy_name(name, copy)
+            department_weights[department] = count
+            department_building[department] = rng.choices(buildings, [building_weights[b] for b in buildings])[0]
+
+    departments = rng.choices(list(department_weights), list(department_weights.values()), k=num_sections)
+    rooms_and_times = Sampler(rng, ROOMS_TIMES)
+    option_weight = Sampler(rng, OPTION_WEIGHTS)
+    candidates = [
+        [f"{d}{s:04d}+{m}" for days, m, starts in groups for d in days for s in starts] for _, groups, _ in TIME_PROFILES]
+
+    course_data = {}
+    department_of = {}
+    used = set()
+    for department in departments:
+        while True:
+            number = rng.randrange(1000, 5000)
+            section = f"{department} {number}-{rng.randrange(1, 4):02d}"
+            if section not in used:
+                break
+        used.add(section)
+        department_of[section] = department
+
+        num_rooms, num_times = rooms_and_times()
+        building = department_building[department]
+        if rng.random() < OTHER_BUILDING:
+            building = _copy_name(rng.choice(list(BUILDINGS)), rng.randrange(copies))
+        if building_weights[building] < num_rooms:
+            # only the big buildings have 9+ rooms to offer, keep the section's size
+            big = [b for b, n in building_weights.items() if n >= num_rooms]
+            building = rng.choices(big, [building_weights[b] for b in big])[0]
+        building_rooms = [f"{building} {100 + i}" for i in range(building_weights[building])]
+        rooms = rng.sample(building_rooms, num_rooms)
+
+        profile = rng.choices(candidates, [times.get(num_times, 0) for _, _, times in TIME_PROFILES])[0]
+        times = rng.sample(profile, min(num_times, len(profile)))
+
+        course_data[section] = {
+            "room_times": {(room, time, option_weight()) for room in rooms for time in times},
+            "hard": set(),
+            "soft": {},
+        }
+
+    sections = list(course_data)
+    hard = {section: {} for section in sections}
+    need = dict(zip(sections, Sampler(rng, HARD_DEGREE)(len(sections))))
+    _link(rng, need, sections, department_of, HARD_SAME_DEPARTMENT, hard, lambda: 100)
+
+    soft = {section: dict(hard[section]) for section in sections}
+    soft_degree = Sampler(rng, SOFT_DEGREE)
+    need = {section: soft_degree() if rng.random() < SOFT_SECTIONS else 0 for section in sections}
+    _link(rng, need, sections, department_of, SOFT_SAME_DEPARTMENT, soft, Sampler(rng, SOFT_TIERS))
+
+    for section in sections:
+        course_data[section]["hard"] = set(hard[section])
+        course_data[section]["soft"] = {
+            other: pts for other, pts in soft[section].items() if other not in hard[section]
+        }
+    return course_data
+
+
+def describe(course_data: Dict) -> Dict[str, Counter]:
+    """The distributions the generator matches, to compare a generated dataset against cset."""
+    stats = {name: Counter() for name in (
+        "days", "options", "total options", "rooms per building", "hard degree", "soft tiers")}
+    rooms = set()
+    for values in course_data.values():
+        stats["options"][len(values["room_times"])] += 1
+        # options in sections of 1-10, 11-100 and 100+ options, the big ones dominate the encoding
+        size = len(values["room_times"])
+        stats["total options"]["all"] += size
+        stats["total options"]["1-10" if size <= 10 else "11-100" if size <= 100 else "100+"] += size
+        stats["hard degree"][len(values["hard"])] += 1
+        stats["soft tiers"].update(values["soft"].values())
+        for room, time, _ in values["room_times"]:
+            rooms.add(room)
+            stats["days"][time[: time.index("+") - 4]] += 1
+    stats["rooms per building"].update(room.split()[0] for room in rooms)
+    return stats
+
+
+if __name__ == "__main__":
+    from datasets.compiled import EXTENSION, compile_course_data
+    from datasets.stream import write_records
+
+    scale, path = float(sys.argv[1]), sys.argv[2]
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else 0
+    course_data = generate_course_data(scale, seed)
+    if path.endswith(EXTENSION):
+        compile_course_data(course_data, path)
+    else:
+        write_records(course_data, path)
+    print(f"{len(course_data)} sections -> {path}")
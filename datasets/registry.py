@@ -0,0 +1,108 @@
+import hashlib, importlib, importlib.util, os
+from typing import Dict, List, Tuple
+
+from datasets.compiled import EXTENSION, CompiledDataset, compiled_path, fresh_compiled_path
+from datasets.stream import STREAM_EXTENSIONS, read_course_data
+
+"""
+Datasets by name, loaded at most once per process.
+
+run_main used to import_module + reload the dataset on every call, so a sweep calling run_main
+in a loop re-executed the whole cset.py dict literal every time. The registry keeps the loaded
+course_data and only loads it again when one of its files changed: the mtime is checked on
+every call and the file contents are hashed only when the mtime moved.
+
+    load_dataset("cset")            datasets/cset.py (or datasets/cset.cdat when it's newer)
+    load_dataset("datasets.cs")     the full module name works too
+    load_dataset("term.jsonl")      streamed exports and .cdat files by path
+
+course_data is shared between callers, treat it as read only.
+"""
+
+
+class DatasetRegistry:
+    def __init__(self):
+        self.sources: Dict[str, str] = {}
+        # source -> (file stats, content hash, course_data)
+        self.loaded: Dict[str, Tuple[tuple, str, Dict]] = {}
+
+    def register(self, name: str, source: str) -> None:
+        """source is a module name or the path of a .cdat / streamed file"""
+        self.sources[name] = source
+
+    def source(self, name: str) -> str:
+        if name in self.sources:
+            return self.sources[name]
+        # module names and file paths are used as is, "cset" is short for "datasets.cset"
+        if "." in name:
+            return name
+        return f"datasets.{name}"
+
+    def files(self, source: str) -> List[str]:
+        if source.endswith(STREAM_EXTENSIONS + (EXTENSION,)):
+            return [source]
+        spec = importlib.util.find_spec(source)
+        if spec is None or spec.origin is None:
+            raise KeyError(f"unknown dataset {source!r}")
+        return [spec.origin, compiled_path(source)]
+
+    def load(self, name: str) -> Dict:
+        source = self.source(name)
+        files = self.files(source)
+        stats = self._stats(files)
+
+        cached = self.loaded.get(source)
+        if cached:
+            cached_stats, digest, course_data = cached
+            if cached_stats == stats:
+                return course_data
+            # touched but not changed (checkout, copy ...) keeps the loaded data
+            if self._digest(files) == digest:
+                self.loaded[source] = (stats, digest, course_data)
+                return course_data
+
+        course_data = self._load(source, reload=cached is not None)
+        self.loaded[source] = (stats, self._digest(files), course_data)
+        return course_data
+
+    def _load(self, source: str, reload: bool) -> Dict:
+        if source.endswith(STREAM_EXTENSIONS):
+            return read_course_data(source)
+        if source.endswith(EXTENSION):
+            return CompiledDataset(source).course_data()
+
+        path = fresh_compiled_path(source)
+        if path:
+            return CompiledDataset(path).course_data()
+        module = importlib.import_module(source)
+        if reload:
+            module = importlib.reload(module)
+        return module.course_data
+
+    @staticmethod
+    def _stats(files: List[str]) -> tuple:
+        stats = []
+        for path in files:
+            try:
+                stat = os.stat(path)
+                stats.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                stats.append(None)
+        return tuple(stats)
+
+    @staticmethod
+    def _digest(files: List[str]) -> str:
+        digest = hashlib.sha256()
+        for path in files:
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    digest.update(f.read())
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+
+DATASETS = DatasetRegistry()
+
+
+def load_dataset(name: str) -> Dict:
+    return DATASETS.load(name)
@@ -0,0 +1,109 @@
+import csv, gzip, json, sys
+from typing import Dict, Iterable, Iterator
+
+"""
+Line oriented dataset exports.
+
+Instead of generating a python module like datasets/cs.py and importing it,
+a registrar export is read one record per line into a course_data dict, so there is no
+compile step and nothing bigger than a single line is ever parsed at once.
+The dict itself is still built in full before ProcessData runs.
+
+Every record has a kind and a section, the other fields depend on the kind:
+    room_time   room, time, weight      ("Smith 107", "MWF0900+50", 10)
+    hard        other                   section and other can never overlap
+    soft        other, pts              section and other should not overlap, pts is the tier
+    section     (nothing)               declares a section, room_time rows do this implicitly
+
+.jsonl      {"kind": "room_time", "section": "CS 2420-01", "room": "Smith 107", "time": "MWF0900+50", "weight": 10}
+.csv        kind,section,room,time,weight,other,pts   (unused columns left empty)
+either one can also be gzipped (.jsonl.gz, .csv.gz)
+"""
+
+CSV_FIELDS = ("kind", "section", "room", "time", "weight", "other", "pts")
+STREAM_EXTENSIONS = (".jsonl", ".csv", ".jsonl.gz", ".csv.gz")
+
+
+def _open(path: str, mode: str = "r"):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8", newline="")
+    return open(path, mode, encoding="utf-8", newline="")
+
+
+def iter_records(path: str) -> Iterator[Dict]:
+    with _open(path) as f:
+        if path.endswith((".csv", ".csv.gz")):
+            for record in csv.DictReader(f):
+                yield record
+            return
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def add_section(course_data: Dict, section: str) -> Dict:
+    values = course_data.get(section)
+    if values is None:
+        values = course_data[section] = {"room_times": set(), "hard": set(), "soft": {}}
+    return values
+
+
+def feed_records(course_data: Dict, records: Iterable[Dict]) -> int:
+    """Add each record to course_data as it is read. Returns the number of records.
+    The room, time and section strings repeat thousands of times in an export,
+    they are interned so every option shares the same string objects, like a compiled module does.
+    """
+    count = 0
+    for count, record in enumerate(records, 1):
+        kind = record["kind"]
+        values = add_section(course_data, sys.intern(record["section"]))
+
+        if kind == "room_time":
+            values["room_times"].add((
+                sys.intern(record["room"]),
+                sys.intern(record["time"]),
+                int(record["weight"] or 0),
+            ))
+        elif kind == "hard":
+            values["hard"].add(sys.intern(record["other"]))
+        elif kind == "soft":
+            values["soft"][sys.intern(record["other"])] = int(record["pts"])
+        elif kind != "section":
+            raise ValueError(f"record {count}: unknown kind {kind!r}")
+    return count
+
+
+def read_course_data(path: str) -> Dict:
+    course_data = {}
+    feed_records(course_data, iter_records(path))
+    return course_data
+
+
+def write_records(course_data: Dict, path: str) -> None:
+    """Export an existing course_data dict, mostly to convert the checked in datasets."""
+    with _open(path, "w") as f:
+        if path.endswith((".csv", ".csv.gz")):
+            writer = csv.writer(f)
+            writer.writerow(CSV_FIELDS)
+            write = lambda record: writer.writerow([record.get(name, "") for name in CSV_FIELDS])
+        else:
+            write = lambda record: f.write(json.dumps(record) + "\n")
+
+        for section, values in course_data.items():
+            write({"kind": "section", "section": section})
+            for room, time, weight in sorted(values["room_times"]):
+                write({"kind": "room_time", "section": section, "room": room, "time": time, "weight": weight})
+            for other in sorted(values["hard"]):
+                write({"kind": "hard", "section": section, "other": other})
+            for other, pts in values["soft"].items():
+                write({"kind": "soft", "section": section, "other": other, "pts": pts})
+
+
+if __name__ == "__main__":
+    # python -m datasets.stream datasets.cset datasets/cset.jsonl
+    import importlib
+
+    module = importlib.import_module(sys.argv[1])
+    write_records(module.course_data, sys.argv[2])
+    print(f"{sys.argv[1]} -> {sys.argv[2]}")
@@ -0,0 +1,116 @@
+import re, sys, logging
+from collections import namedtuple
+from typing import Dict, List
+
+"""
+Single pass schema check of a course_data dict.
+
+Bad data otherwise fails late: a malformed time string inside ProcessData.calculate_time_slot,
+a hard edge to a missing section as a KeyError in process_conflicts after minutes of work.
+validate_course_data walks every section once and returns every problem it finds,
+so it is cheap enough to run before every ProcessData.
+
+    python -m datasets.validate datasets.cset
+"""
+
+Problem = namedtuple("Problem", ["location", "message"])
+
+# "MWF0900+50": day letters, HHMM start, "+" duration in minutes
+TIME_PATTERN = re.compile(r"([MTWRFSU]+)([0-2][0-9])([0-5][0-9])\+([0-9]+)")
+SECTION_KEYS = ("room_times", "hard", "soft")
+
+
+def validate_course_data(course_data: Dict) -> List[Problem]:
+    problems = []
+    checked_times = {}
+
+    for section, values in course_data.items():
+        if not isinstance(values, dict) or any(key not in values for key in SECTION_KEYS):
+            problems.append(Problem(section, f"expected a dict with {SECTION_KEYS}"))
+            continue
+
+        if not values["room_times"]:
+            problems.append(Problem(f"{section}.room_times", "no options, section can never be scheduled"))
+
+        seen = {}
+        for option in values["room_times"]:
+            location = f"{section}.room_times{option}"
+            if not (isinstance(option, tuple) and len(option) == 3):
+                problems.append(Problem(location, "expected (room, time, weight)"))
+                continue
+            room, time, weight = option
+            if not isinstance(weight, int):
+                problems.append(Problem(location, f"weight {weight!r} is not an int"))
+
+            # the same handful of time strings repeat thousands of times, only check each once
+            slot = checked_times.get(time)
+            if slot is None:
+                slot = checked_times[time] = _check_time(time)
+            if isinstance(slot, str):
+                problems.append(Problem(location, slot))
+                continue
+
+            key = (room, slot)
+            if key in seen:
+                problems.append(Problem(location, f"duplicate of {seen[key]}"))
+            else:
+                seen[key] = option
+
+        for other in values["hard"]:
+            if other not in course_data:
+                problems.append(Problem(f"{section}.hard", f"unknown section {other!r}"))
+            elif other == section:
+                problems.append(Problem(f"{section}.hard", "section conflicts with itself"))
+
+        for other, pts in values["soft"].items():
+            location = f"{section}.soft[{other!r}]"
+            if other not in course_data:
+                problems.append(Problem(location, f"unknown section {other!r}"))
+                continue
+            # any int is a tier, conflict_combinations gets a bucket for every value in the data
+            if not isinstance(pts, int) or isinstance(pts, bool):
+                problems.append(Problem(location, f"pts {pts!r} is not an int"))
+            other_values = course_data[other]
+            # not a problem, ProcessData.pair_conflict_tiers puts the pair in both tiers. only worth a warning
+            # once per pair, from the smaller name
+            if section < other and isinstance(other_values, dict):
+                other_pts = other_values.get("soft", {}).get(section)
+                if other_pts is not None and other_pts != pts:
+                    logging.warning(f"{location}: {other!r} lists this pair as {other_pts}, both tiers apply")
+
+    return problems
+
+
+def _check_time(time) -> object:
+    # returns the parsed (days, start, duration) or a message describing what is wrong
+    if not isinstance(time, str):
+        return f"time {time!r} is not a string"
+    match = TIME_PATTERN.fullmatch(time)
+    if not match:
+        return f"time {time!r} does not look like 'MWF0900+50'"
+    days, hours, minutes, duration = match.groups()
+    if int(hours) > 23:
+        return f"time {time!r} starts after 23:59"
+    if len(set(days)) != len(days):
+        return f"time {time!r} repeats a day"
+    if int(duration) == 0:
+        return f"time {time!r} has no duration"
+    return (frozenset(days), int(hours + minutes), int(duration))
+
+
+def check_course_data(course_data: Dict) -> None:
+    """Raise a ValueError listing every problem in course_data."""
+    problems = validate_course_data(course_data)
+    if problems:
+        report = "\n".join(f"    {location}: {message}" for location, message in problems)
+        raise ValueError(f"{len(problems)} problems in course_data:\n{report}")
+
+
+if __name__ == "__main__":
+    from datasets.compiled import load_course_data
+
+    for name in sys.argv[1:] or ["datasets.cs", "datasets.cset"]:
+        problems = validate_course_data(load_course_data(name))
+        print(f"{name}: {len(problems)} problems")
+        for location, message in problems:
+            print(f"    {location}: {message}")
@@ -0,0 +1,253 @@
+from dataclasses import replace
+from types import MappingProxyType
+from itertools import chain
+from typing import Dict, Iterable, Tuple
+
+from option_table import update_option_table
+from process_data import (
+    INDEX_DEPTHS, Data, ProcessData, SymbolTable, build_adjacency, char_times, conflict_bits, conflict_tiers, freeze_index,
+    literal_order, room_cliques, section_bits, to_bits)
+
+"""
+Apply a small change to an already processed Data without running ProcessData again.
+
+    delta = {
+        "sections": {
+            "CS 2420-01": {"room_times": {...}},              # replace one or more keys of a section
+            "CS 9999-01": {"room_times": {...}, "hard": {...}, "soft": {...}},   # or add a new one
+        },
+        "remove": ["CS 1030-01"],                             # sections to drop
+    }
+    data, course_data = apply_delta(data, course_data, delta)
+
+Only the entries of the touched sections are recomputed. New options get literals starting at
+data.current_literal, removed options simply retire their literal, so every literal that was
+already handed out keeps meaning the same course/room/time.
+Nothing is modified in place, the old Data and course_data stay valid.
+"""
+
+
+class DeltaIndexes:
+    """Copy on write view of the indexes in a Data. Dicts are copied once when the delta starts,
+    the inner sets only when they are actually changed, so the original Data is never touched."""
+
+    MAPPINGS = (
+        "course_to_literal", "literal_to_course", "section_template", "literals_by_section",
+        "literals_by_time", "room_time_literals", "time_conflict_ids", "time_ids_by_section",
+    )
+
+    def __init__(self, data: Data):
+        for name in self.MAPPINGS:
+            setattr(self, name, dict(getattr(data, name)))
+        self.conflict_combinations = {pts: set(pairs) for pts, pairs in data.conflict_combinations.items()}
+        self.conflict_id_combinations = {pts: set(pairs) for pts, pairs in data.conflict_id_combinations.items()}
+        self.templates = list(data.templates)
+        self.adjacency_offsets, self.adjacency_targets = data.adjacency_offsets, data.adjacency_targets
+        self.current_literal = data.current_literal
+        self.sections, self.rooms, self.times = (
+            _copy_table(data.sections), _copy_table(data.rooms), _copy_table(data.times))
+        # ids whose literals changed, only their bitsets, cliques and table rows are redone in freeze
+        self.touched_sections, self.touched_times, self.touched_rooms = set(), set(), set()
+        self.retired = set()
+
+    @staticmethod
+    def add(index: dict, key, value) -> None:
+        index[key] = set(index.get(key, ())) | {value}
+
+    @staticmethod
+    def discard(index: dict, key, value) -> None:
+        if key in index:
+            index[key] = set(index[key]) - {value}
+
+    def nested(self, index: dict, key) -> dict:
+        # room_time_literals holds a dict per room
+        inner = index[key] = dict(index.get(key, {}))
+        return inner
+
+    def freeze(self, data: Data) -> Data:
+        # every int would be copied on change anyway, so the touched bitsets are simply built again
+        bits_by_section, bits_by_time = dict(data.bits_by_section), dict(data.bits_by_time)
+        for section_id in self.touched_sections:
+            if section_id in self.literals_by_section:
+                bits_by_section[section_id] = section_bits(self.literals_by_section[section_id])
+            else:
+                bits_by_section.pop(section_id, None)
+        for time_id in self.touched_times:
+            bits_by_time[time_id] = to_bits(self.literals_by_time[time_id], self.current_literal)
+        # a time's conflict bits only change when one of the times it overlaps did
+        conflict_bits_by_time = dict(data.conflict_bits_by_time)
+        nearby = set(chain.from_iterable(self.time_conflict_ids[time_id] for time_id in self.touched_times))
+        for time_id in nearby & bits_by_time.keys():
+            conflict_bits_by_time[time_id] = conflict_bits(time_id, self.time_conflict_ids, bits_by_time)
+
+        cliques = dict(data.room_cliques)
+        cliques.update(room_cliques(
+            {room_id: self.room_time_literals[room_id] for room_id in self.touched_rooms}, self.times))
+        return replace(
+            data,
+            current_literal=self.current_literal,
+            templates=tuple(self.templates),
+            adjacency_offsets=self.adjacency_offsets, adjacency_targets=self.adjacency_targets,
+            sections=self.sections, rooms=self.rooms, times=self.times,
+            conflict_combinations=freeze_index(self.conflict_combinations),
+            conflict_id_combinations=freeze_index(self.conflict_id_combinations),
+            bits_by_section=MappingProxyType(bits_by_section),
+            bits_by_time=MappingProxyType(bits_by_time),
+            conflict_bits_by_time=MappingProxyType(conflict_bits_by_time),
+            room_cliques=MappingProxyType(cliques),
+            # the sets that were copied on write are frozen again, untouched entries already are
+            **{name: freeze_index(getattr(self, name), INDEX_DEPTHS[name]) for name in self.MAPPINGS},
+        )
+
+
+def _copy_table(table: SymbolTable) -> SymbolTable:
+    copy = SymbolTable()
+    copy.ids, copy.names = dict(table.ids), list(table.names)
+    return copy
+
+
+def apply_delta(data: Data, course_data: Dict, delta: Dict) -> Tuple[Data, Dict]:
+    changes = delta.get("sections", {})
+    removed = set(delta.get("remove", ()))
+    course_data = dict(course_data)
+    index = DeltaIndexes(data)
+
+    # sections whose options or edges have to be recomputed
+    moved, linked = set(removed), set(removed)
+    for section, values in changes.items():
+        old = course_data.get(section, {"room_times": set(), "hard": set(), "soft": {}})
+        course_data[section] = {**old, **values}
+        new = data.sections.ids.get(section) not in data.literals_by_section
+        if new or "room_times" in values:
+            moved.add(section)
+        if new or "hard" in values or "soft" in values:
+            linked.add(section)
+
+    for section in removed:
+        course_data.pop(section, None)
+    # nothing may keep pointing at a removed section
+    if removed:
+        for section, values in course_data.items():
+            if removed & set(values["hard"]) or removed & set(values["soft"]):
+                course_data[section] = {
+                    **values,
+                    "hard": {other for other in values["hard"] if other not in removed},
+                    "soft": {other: pts for other, pts in values["soft"].items() if other not in removed},
+                }
+
+    for section in moved:
+        remove_options(index, section)
+    for section in moved - removed:
+        add_options(index, section, course_data[section]["room_times"])
+    if linked:
+        # the CSR arrays can't be patched in place, rebuilding them is a single pass over the edges
+        index.adjacency_offsets, index.adjacency_targets = build_adjacency(course_data, index.sections.ids)
+    for section in linked:
+        relink(index, course_data, section, removed)
+    if linked:
+        # one bucket per tier still in the data, in the order ProcessData would give them
+        tiers = conflict_tiers(course_data)
+        index.conflict_combinations = {pts: index.conflict_combinations.get(pts, set()) for pts in tiers}
+        index.conflict_id_combinations = {pts: index.conflict_id_combinations.get(pts, set()) for pts in tiers}
+
+    new_data = index.freeze(data)
+    if moved:
+        new_data.option_table = update_option_table(
+            data.option_table, new_data, course_data, index.retired, moved - removed)
+    return new_data, course_data
+
+
+def remove_options(index: DeltaIndexes, section: str) -> None:
+    section_id = index.sections.ids.get(section)
+    index.touched_sections.add(section_id)
+    for literal in index.literals_by_section.pop(section_id, ()):
+        course_key = index.literal_to_course.pop(literal)
+        # the same room and time listed twice has two literals, the key is gone after the first
+        index.course_to_literal.pop(course_key, None)
+        index.retired.add(literal)
+
+        _, room, time_slot = course_key
+        room_id = index.rooms.ids[room]
+        index.touched_rooms.add(room_id)
+        room_literals = index.nested(index.room_time_literals, room_id)
+        for char_time in char_times(time_slot):
+            time_id = index.times.ids[char_time]
+            index.touched_times.add(time_id)
+            index.discard(room_literals, time_id, literal)
+            index.discard(index.literals_by_time, time_id, literal)
+
+    index.section_template.pop(section, None)
+    index.time_ids_by_section.pop(section_id, None)
+
+
+def add_options(index: DeltaIndexes, section: str, room_times: Iterable) -> None:
+    section_id = index.sections.intern(section)
+    index.touched_sections.add(section_id)
+    options, time_ids, literals = [], set(), set()
+
+    # same numbering order as ProcessData, see literal_order
+    slots = sorted(((room, ProcessData.calculate_time_slot(time)) for room, time, _ in room_times), key=literal_order)
+    for room, time_slot in slots:
+        course_key = (section, room, time_slot)
+        literal = index.current_literal
+        index.current_literal += 1
+        index.course_to_literal[course_key] = literal
+        index.literal_to_course[literal] = course_key
+        literals.add(literal)
+        options.append((room, time_slot))
+
+        room_id = index.rooms.intern(room)
+        index.touched_rooms.add(room_id)
+        room_literals = index.nested(index.room_time_literals, room_id)
+        for char_time in char_times(time_slot):
+            if char_time not in index.times.ids:
+                add_time(index, char_time)
+            time_id = index.times.ids[char_time]
+            time_ids.add(time_id)
+            index.touched_times.add(time_id)
+            index.add(room_literals, time_id, literal)
+            index.add(index.literals_by_time, time_id, literal)
+
+    index.literals_by_section[section_id] = literals
+    index.time_ids_by_section[section_id] = frozenset(time_ids)
+    # changed sections get their own template, it is only shared again after a full ProcessData
+    index.section_template[section] = len(index.templates)
+    index.templates.append(tuple(options))
+
+
+def add_time(index: DeltaIndexes, char_time) -> None:
+    # same closed interval overlap as process_data.sweep_day
+    time_id = index.times.intern(char_time)
+    day, start, end = char_time
+    overlapping = {time_id}
+    for other_id, (other_day, other_start, other_end) in enumerate(index.times.names):
+        if other_day == day and other_start <= end and start <= other_end:
+            overlapping.add(other_id)
+
+    for other_id in overlapping:
+        index.add(index.time_conflict_ids, other_id, time_id)
+    index.time_conflict_ids[time_id] = overlapping
+
+
+def relink(index: DeltaIndexes, course_data: Dict, section: str, removed: set) -> None:
+    for pts in index.conflict_combinations:
+        index.conflict_combinations[pts] = {
+            pair for pair in index.conflict_combinations[pts] if section not in pair}
+    section_id = index.sections.ids.get(section)
+    if section_id is not None:
+        for pts in index.conflict_id_combinations:
+            index.conflict_id_combinations[pts] = {
+                pair for pair in index.conflict_id_combinations[pts] if section_id not in pair}
+    if section in removed:
+        return
+
+    # the adjacency holds both directions, the other section may list this one without being listed back
+    offsets, names = index.adjacency_offsets, index.sections.names
+    for i in range(offsets[section_id], offsets[section_id + 1]):
+        other = names[index.adjacency_targets[i]]
+        section1, section2 = min(section, other), max(section, other)
+        # a delta may bring a pts value the data didn't have yet, apply_delta orders the tiers afterwards
+        for pts in ProcessData.pair_conflict_tiers(course_data, section1, section2):
+            index.conflict_combinations.setdefault(pts, set()).add((section1, section2))
+            index.conflict_id_combinations.setdefault(pts, set()).add(
+                (index.sections.ids[section1], index.sections.ids[section2]))
@@ -0,0 +1,83 @@
+try:
+    import numpy as np
+    from scipy import sparse
+except ImportError:  # scipy is optional, no_hard_conflicts keeps its per time loop without it
+    np = sparse = None
+
+"""
+Sparse option x time incidence for the time conflict constraint in main.py.
+
+occupancy[l, t] is 1 when literal l is at the per day time t, overlap[t, u] is 1 when t and u
+overlap (time_conflict_ids). Two options clash exactly when
+
+    occupancy @ overlap @ occupancy.T
+
+is non zero for them. Over every option that is most of the pairs at a busy hour, but a clause
+is only needed for the section pairs in conflict_id_combinations. candidate_pairs stacks the
+rows of each constrained pair and gives every pair its own copy of the time columns, so one
+product holds nothing but the blocks of those pairs and its size is the number of clauses:
+
+    rows (pair, option of s1) x columns (pair, time)  @  (rows (pair, option of s2) x (pair, time)).T
+"""
+
+
+class TimeIncidence:
+    def __init__(self, occupancy, reach, section_literals):
+        self.occupancy = occupancy
+        # occupancy @ overlap, every time an option clashes with
+        self.reach = reach
+        self.section_literals = section_literals
+
+    def candidate_pairs(self, section_pairs):
+        """(literals1, literals2) arrays, one entry per clashing option pair of section_pairs."""
+        literals1, literals2, pair_ids1, pair_ids2 = [], [], [], []
+        for pair_id, (section1, section2) in enumerate(sorted(section_pairs)):
+            options1, options2 = self.section_literals[section1], self.section_literals[section2]
+            # a reach row holds ~20x the entries of an occupancy row, take it from the smaller section
+            if len(options1) > len(options2):
+                options1, options2 = options2, options1
+            literals1.append(options1)
+            literals2.append(options2)
+            pair_ids1.append(np.full(len(options1), pair_id, dtype=np.int64))
+            pair_ids2.append(np.full(len(options2), pair_id, dtype=np.int64))
+        if not literals1:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        literals1, literals2 = np.concatenate(literals1), np.concatenate(literals2)
+        num_times = self.occupancy.shape[1]
+        columns = num_times * len(pair_ids1)
+        left = _shift_columns(self.reach[literals1], np.concatenate(pair_ids1) * num_times, columns)
+        right = _shift_columns(self.occupancy[literals2], np.concatenate(pair_ids2) * num_times, columns)
+        clashes = (left @ right.T).tocoo()
+        return literals1[clashes.row], literals2[clashes.col]
+
+
+def _shift_columns(matrix, row_offsets, columns: int):
+    # moves the columns of row i over by row_offsets[i], each pair gets its own block of times
+    indices = matrix.indices.astype(np.int64) + np.repeat(row_offsets, np.diff(matrix.indptr))
+    return sparse.csr_matrix((matrix.data, indices, matrix.indptr.astype(np.int64)), shape=(matrix.shape[0], columns))
+
+
+def build_time_incidence(data):
+    """TimeIncidence for a processed Data, or None when scipy isn't installed."""
+    if sparse is None:
+        return None
+
+    literals, times = [], []
+    for time_id, time_literals in data.literals_by_time.items():
+        literals.extend(time_literals)
+        times.extend([time_id] * len(time_literals))
+    rows, cols = [], []
+    for time_id, others in data.time_conflict_ids.items():
+        rows.extend([time_id] * len(others))
+        cols.extend(others)
+
+    num_times = len(data.times)
+    occupancy = sparse.csr_matrix(
+        (np.ones(len(literals), dtype=np.int32), (literals, times)), shape=(data.current_literal, num_times))
+    overlap = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.int32), (rows, cols)), shape=(num_times, num_times))
+    section_literals = {
+        section_id: np.array(sorted(section_literals), dtype=np.int64)
+        for section_id, section_literals in data.literals_by_section.items()}
+    return TimeIncidence(occupancy, occupancy @ overlap, section_literals)
@@ -1,35 +1,27 @@
-import cProfile, traceback, importlib, pstats, io
-from itertools import combinations
+import cProfile, pstats, io
+from math import isqrt
 from collections import defaultdict
 from typing import Dict
 from pysat.card import CardEnc
+from process_data import Data, from_bits
+from clauses import ClauseArena
+from incidence import build_time_incidence
 
-
-DATA = None
-CURRENT_LITERAL: int
-TOTAL_CLAUSES = 0
-ALL_LITERALS = set()
-DEBUG_CNF = True
-DEBUG_CNF_LITERALS: Dict = defaultdict(set)
-CHECKED = set()
-
-def one_course_per_section():
-    for section, courses in DATA.section_to_crt.items():
-        course_lit = [DATA.course_to_literal[course] for course in courses]
-        add_pair(course_lit, key=("one course per section", section))
-        atmost_one(course_lit, key=("one course per section", section))
-
+# at most one of n literals: pairwise needs n(n-1)/2 clauses, sequential 3n-4 and n-1 aux literals,
+# product about 2n + 4 sqrt(n) and 2 sqrt(n) aux. pairwise up to PAIRWISE_MAX, product from PRODUCT_MIN
+PAIRWISE_MAX = 5
+PRODUCT_MIN = 32
 
 def profile_function(func):
     """Context manager to profile a specific function."""
 
     def wrapper(*args, **kwargs):
         pr = cProfile.Profile()
-        pr.enable() 
+        pr.enable()
 
-        result = func(*args, **kwargs) 
+        result = func(*args, **kwargs)
 
-        pr.disable()  
+        pr.disable()
 
         stats = io.StringIO()
         ps = pstats.Stats(pr, stream=stats).sort_stats("cumulative")
@@ -41,231 +33,257 @@ def profile_function(func):
     return wrapper
 
 
-# @profile_function
-def only_one_per_room():
-    for building_room, times in DATA.building_room_course.items():
-        for time1, courses1 in times.items():
-            # only times that are possible for this room,
-            # and also conflicts with the current time need to be checked
-            conflicting_room_times = DATA.time_conflicts[time1] & set(times)
-
-            if courses1 and conflicting_room_times:
-                for time2 in conflicting_room_times:
-                    courses2 = DATA.building_room_course[building_room][time2]
-                    if (tuple(courses1), tuple(courses2)) in CHECKED:
-                        # print(f"duplicate {(tuple(courses1), tuple(courses2))}")
-                        continue
-                    else:
-                        CHECKED.add((tuple(courses1), tuple(courses2)))
-                    if courses2:
-                        atmost_one(courses1, courses2, key=("room_literals"))
-
-
-def no_hard_conflicts(combination_set, k=0, pts_key=None):
-    global CURRENT_LITERAL
-    if k == 0:
-        return
-
-    aux_var_set = []
-
-    for section1, section2 in combination_set:
-        courses1 = DATA.section_to_crt[section1]
-        courses2 = DATA.section_to_crt[section2]
-
-        # you only need to check times that are present in both sections.
-        mutual_times = DATA.times_by_section[section1] | DATA.times_by_section[section2]
-
-        for each_time in mutual_times:
-            used_aux = False
-            section1_conflicts = (
-                DATA.time_conflicts[each_time] & DATA.times_by_section[section1])
-            section2_conflicts = (
-                DATA.time_conflicts[each_time] & DATA.times_by_section[section2])
-            
-            #  35226981    2.083    0.000    2.083    0.000 main.py:91(<genexpr>)
-            conflicts1 = (
-                set(
-                    course
-                    for time_conflict in section1_conflicts
-                    for course in DATA.courses_by_time[time_conflict])
-                & courses1)
-
-            #  34831805    2.072    0.000    2.072    0.000 main.py:98(<genexpr>)
-            conflicts2 = (
-                set(
-                    course
-                    for time_conflict in section2_conflicts
-                    for course in DATA.courses_by_time[time_conflict])
-                & courses2)
-
-            if len(conflicts1) < 1 or len(conflicts2) < 1:
-                continue
-
-            if k <= 1:
-                atmost_one(
-                    conflicts1, conflicts2, key=("atmost_one", pts_key, section1, section2))
-
-            else:
-                used_aux = True
-
-                atmost_one(
-                    conflicts1,
-                    conflicts2,
-                    aux_var=CURRENT_LITERAL,
-                    k=k,
-                    key=("atmost_one", pts_key, section1, section2, each_time),
-                )
-
-            # only inc the current literal if it was used for this timeslot
-            # and only before the next set of sections
-            if used_aux:
-                aux_var_set.append(CURRENT_LITERAL)
-                CURRENT_LITERAL += 1
-
-    if k >= 1 and len(aux_var_set) > 1:
-        sequential_k_greater_one(aux_var_set, k, pts_key=pts_key)
-
-        # VERY VERY SLOW
-        # totalizer_k_greater_one(aux_var_set, k, key=key)
-
-
-def sequential_k_greater_one(aux_var_set, k, pts_key=None):
-    global CURRENT_LITERAL
-    # encoding = [1, 2 ...8]
-    cnf = CardEnc.atmost(lits=aux_var_set, top_id=CURRENT_LITERAL, bound=k, encoding=3)
-    max_literal = max(abs(lit) for clause in cnf for lit in clause)
-    
-    CURRENT_LITERAL = max(CURRENT_LITERAL, max_literal)
-    add_pair(cnf, key=(pts_key, k, "sequential"))
-
-
-"""
-- can accept int literals or course variables that need to translate to their int literals.
-- allows passing a single list where all items are mutually exclusive
-- also allows passing two lists where items from list1 are exclusive to list2 but list1 is not exclusive to itself
-    and list2 not exclusive to itself. this reduces duplicate clauses which seems to
-    mostly help with printing the CNF moreso than running the actual solver.
-"""
-# @profile_function
-def atmost_one(courses1, courses2=None, aux_var=None, k=1, key=None):
-    pystat_current_lits = []
-
-    # Translate variables to literals if they aren't integers
-    # allowing the other functions to focus on gathering the items 
-    # while this function handles generating the clauses
-    def map_to_literal(item):
-        return DATA.course_to_literal.get(item, item) if not isinstance(item, int) else item
-
-    courses1_literals = [map_to_literal(i) for i in courses1]
-    courses2_literals = [map_to_literal(j) for j in courses2] if courses2 else courses1_literals
-
-    # Generate pairs between lists (or within a single list if courses2 is None)
-    for i in courses1_literals:
-        for j in courses2_literals:
-            if courses2 == None:
-                if i >= j:  # Ensure unique pairs (i, j) when using mutual exclusivity
+class Encoder:
+    """Builds the CNF for one Data + constraints. Every clause, aux literal and counter belongs
+    to the instance, so any number of encodings can run one after another (or side by side)
+    in the same process without sharing anything."""
+
+    def __init__(self, data: Data, constraints: Dict, debug: bool = True):
+        self.data = data
+        self.constraints = constraints
+        self.debug = debug
+        # aux literals start right after the course literals
+        self.current_literal = data.current_literal
+        # key -> clauses, the key becomes a comment in the debug CNF. everything is under None otherwise
+        self.clauses: Dict = defaultdict(ClauseArena)
+        # built on first use, see incidence.py. False once it turned out scipy isn't installed
+        self.time_incidence = None
+
+    @property
+    def total_clauses(self) -> int:
+        return sum(len(arena) for arena in self.clauses.values())
+
+    # every aux literal comes from here, current_literal is always the next free one
+    def new_literal(self) -> int:
+        literal = self.current_literal
+        self.current_literal += 1
+        return literal
+
+    def arena(self, key) -> ClauseArena:
+        return self.clauses[key if self.debug else None]
+
+    # duplicates are only dropped here, once per phase, see clauses.py
+    def dedupe(self) -> None:
+        for arena in self.clauses.values():
+            arena.dedupe()
+
+    def encode(self) -> "Encoder":
+        print(f"only one per room ... ")
+        self.only_one_per_room()
+        self.dedupe()
+
+        print(f"only one course per section...")
+        self.one_course_per_section()
+        self.dedupe()
+
+        print("no time conflicts ...")
+        for pts_key, section_combinations in self.data.conflict_id_combinations.items():
+            k_value = self.constraints[pts_key]
+            if k_value > 0:  # Only call if the constraint is greater than 0
+                self.no_hard_conflicts(section_combinations, k=k_value, pts_key=pts_key)
+        self.dedupe()
+        return self
+
+    def one_course_per_section(self):
+        for section_id, course_lit in self.data.literals_by_section.items():
+            section = self.data.sections[section_id]
+            # sorted, the aux literals of the larger encodings are numbered in this order
+            # and frozenset order changes after a pickle round trip (cache.py)
+            course_lit = sorted(course_lit)
+            self.add_pair(course_lit, key=("one course per section", section))
+            self.atmost_one(course_lit, key=("one course per section", section))
+
+    # @profile_function
+    def only_one_per_room(self):
+        # every group of options overlapping in a room comes precomputed, see room_cliques in process_data.py
+        for room_id, cliques in self.data.room_cliques.items():
+            for clique in cliques:
+                self.atmost_one(sorted(clique), key=("room_literals"))
+
+    def incidence(self):
+        if self.time_incidence is None:
+            self.time_incidence = build_time_incidence(self.data) or False
+        return self.time_incidence
+
+    def no_hard_conflicts(self, combination_set, k=0, pts_key=None):
+        if k == 0:
+            return
+
+        # k = 1 is one clause per pair of clashing options, all of them from one sparse product.
+        # k > 1 needs an aux literal per time of the pair, that stays on the loop below
+        if k == 1 and self.incidence():
+            literals1, literals2 = self.incidence().candidate_pairs(combination_set)
+            self.arena(("atmost_one", pts_key)).pairs(literals1, literals2)
+            return
+
+        data = self.data
+        aux_var_set = []
+
+        # combination_set holds section ids, every index below is keyed by ints and holds literals
+        # sorted for the same reason as one_course_per_section, the k > 1 aux literals follow this order
+        for section1, section2 in sorted(combination_set):
+            first1, bits1 = data.bits_by_section[section1]
+            first2, bits2 = data.bits_by_section[section2]
+            times1 = data.time_ids_by_section[section1]
+            times2 = data.time_ids_by_section[section2]
+            section_names = (data.sections[section1], data.sections[section2])
+
+            # you only need to check times that are present in both sections.
+            mutual_times = sorted(times1 | times2)
+
+            for each_time in mutual_times:
+                used_aux = False
+                # the options of each section at a time overlapping each_time, a shift and an AND per section.
+                # this used to union literals_by_time over every conflicting time (35M genexpr calls, ~4s)
+                conflict_bits = data.conflict_bits_by_time[each_time]
+                conflicts1 = from_bits((conflict_bits >> first1) & bits1, first1)
+                conflicts2 = from_bits((conflict_bits >> first2) & bits2, first2)
+
+                if len(conflicts1) < 1 or len(conflicts2) < 1:
                     continue
-            if i == j:  # Skip pairs with identical literals
-                continue
-            
-            # Construct clause
-            clause = [-i, -j] if k == 1 else [-i, -j, aux_var]
-            pystat_current_lits.append(clause)
-            add_pair(clause, key=key)
-    return pystat_current_lits
-
-
-def add_pair(pair, key=None):
-    global TOTAL_CLAUSES, DEBUG_CNF_LITERALS
-
-    if all(isinstance(p, list) for p in pair):
-        for sub_pair in pair:
-            add_pair(sub_pair, key)
-        return
-
-    # checking an items existence in a python set is O(1) on average, 
-    # so since we need the total number of clauses, 
-    # it should be faster to check if a clause exists in the set
-    # before adding/incremening vs checking the length at the end.
-    # this will also help avoid duplicates in the CNF file which
-    # should not slow the solver, but does slow the
-    # parsing/creation of the cnf.
-    pair = tuple(pair)
-    if pair in DEBUG_CNF_LITERALS[key] or pair in ALL_LITERALS:
-        return
-    if DEBUG_CNF:
-        DEBUG_CNF_LITERALS[key].add(pair)
-    else:
-        ALL_LITERALS.add(pair)
-    TOTAL_CLAUSES += 1
-
-
-# about two seconds
-def write_cnf() -> None:
-    # Adjust according to how many chunks you want
-    chunk_size = (max(len(DEBUG_CNF_LITERALS), len(ALL_LITERALS)) // 8) + 1
-    # add_pair(CLAUSES_BUFFER, key="leftover clauses buffer")
-
-    # 512 KB buffer, adjust for your machine
-    with open("results/output.cnf", "w", buffering=524288) as f:
-        f.write(f"p cnf {CURRENT_LITERAL} {TOTAL_CLAUSES}\n")
-
-        if DEBUG_CNF:
-            for comment, data in DEBUG_CNF_LITERALS.items():
-                chunk = list(data)
-                f.write(f"c {comment} \n")
-                buffer = []
-                for clause in chunk:
-                    buffer.append(" ".join(map(str, clause)) + " 0\n")
-                f.write("".join(buffer))
 
+                if k <= 1:
+                    self.atmost_one(
+                        conflicts1, conflicts2, key=("atmost_one", pts_key, *section_names))
+
+                else:
+                    used_aux = True
+
+                    self.atmost_one(
+                        conflicts1,
+                        conflicts2,
+                        aux_var=self.current_literal,
+                        k=k,
+                        key=("atmost_one", pts_key, *section_names, data.times[each_time]),
+                    )
+
+                # only inc the current literal if it was used for this timeslot
+                # and only before the next set of sections
+                if used_aux:
+                    aux_var_set.append(self.current_literal)
+                    self.current_literal += 1
+
+        if k >= 1 and len(aux_var_set) > 1:
+            self.sequential_k_greater_one(aux_var_set, k, pts_key=pts_key)
+
+            # VERY VERY SLOW
+            # totalizer_k_greater_one(aux_var_set, k, key=key)
+
+    def sequential_k_greater_one(self, aux_var_set, k, pts_key=None):
+        # encoding = [1, 2 ...8]
+        cnf = CardEnc.atmost(lits=aux_var_set, top_id=self.current_literal, bound=k, encoding=3)
+        max_literal = max(abs(lit) for clause in cnf for lit in clause)
+
+        # max_literal is taken, the next free one is after it
+        self.current_literal = max(self.current_literal, max_literal + 1)
+        self.add_pair(cnf, key=(pts_key, k, "sequential"))
+
+    """
+    - can accept int literals or course variables that need to translate to their int literals.
+    - allows passing a single list where all items are mutually exclusive
+    - also allows passing two lists where items from list1 are exclusive to list2 but list1 is not exclusive to itself
+        and list2 not exclusive to itself. this reduces duplicate clauses which seems to
+        mostly help with printing the CNF moreso than running the actual solver.
+    """
+    # @profile_function
+    def atmost_one(self, courses1, courses2=None, aux_var=None, k=1, key=None):
+        course_to_literal = self.data.course_to_literal
+
+        # Translate variables to literals if they aren't integers
+        # allowing the other functions to focus on gathering the items
+        # while this function handles generating the clauses
+        def map_to_literal(item):
+            return course_to_literal.get(item, item) if not isinstance(item, int) else item
+
+        courses1_literals = [map_to_literal(i) for i in courses1]
+        courses2_literals = [map_to_literal(j) for j in courses2] if courses2 else None
+
+        # the pairs go straight into the int32 arena, no tuple per clause
+        if courses2_literals is None and k == 1:
+            self.atmost_one_group(courses1_literals, self.arena(key))
         else:
-            print("standard cnf")
-            all_list = list(ALL_LITERALS)
-            for i in range(0, len(ALL_LITERALS), chunk_size):
-                chunk = all_list[i : i + chunk_size]  
-                buffer = [" ".join(map(str, clause)) + " 0\n" for clause in chunk]
-                f.write("".join(buffer)) 
-
-
-def main(course_data, constraints, debug) -> bool:
-    global DATA, CURRENT_LITERAL, DEBUG_CNF
-    
-    DEBUG_CNF = debug
-    DATA = course_data
-    CURRENT_LITERAL = DATA.current_literal
-
-    print(f"only one per room ... ")
-    only_one_per_room()
-
-    print(f"only one course per section...")
-    one_course_per_section()
-
-    print("no time conflicts ...")
-    for pts_key, section_combinations in DATA.conflict_combinations.items():
-        k_value = constraints[pts_key]
-        if k_value > 0:  # Only call if the constraint is greater than 0
-            no_hard_conflicts(section_combinations, k=k_value, pts_key=pts_key)
+            self.arena(key).exclusive(courses1_literals, courses2_literals, aux=None if k == 1 else aux_var)
+
+    # at most one of a single group, the encoding is picked by size. see PAIRWISE_MAX
+    def atmost_one_group(self, literals, arena: ClauseArena) -> None:
+        if len(literals) <= PAIRWISE_MAX:
+            arena.exclusive(literals)
+        elif len(literals) < PRODUCT_MIN:
+            self.sequential_group(literals, arena)
+        else:
+            self.product_group(literals, arena)
+
+    # Sinz ladder: aux s_i is true once any of the first i literals is
+    def sequential_group(self, literals, arena: ClauseArena) -> None:
+        if len(literals) < 2:
+            return
+        previous = self.new_literal()
+        arena.append((-literals[0], previous))
+        for literal in literals[1:-1]:
+            current = self.new_literal()
+            arena.append((-literal, current))
+            arena.append((-previous, current))
+            arena.append((-literal, -previous))
+            previous = current
+        arena.append((-literals[-1], -previous))
+
+    # Chen's product encoding: literal i sits at (i // columns, i % columns) of a grid and
+    # implies its row and its column, then at most one row and at most one column
+    def product_group(self, literals, arena: ClauseArena) -> None:
+        columns = isqrt(len(literals) - 1) + 1
+        rows = -(-len(literals) // columns)
+        row_literals = [self.new_literal() for _ in range(rows)]
+        column_literals = [self.new_literal() for _ in range(columns)]
+        for i, literal in enumerate(literals):
+            row, column = divmod(i, columns)
+            arena.append((-literal, row_literals[row]))
+            arena.append((-literal, column_literals[column]))
+        self.atmost_one_group(row_literals, arena)
+        self.atmost_one_group(column_literals, arena)
+
+    def add_pair(self, pair, key=None):
+        if all(isinstance(p, list) for p in pair):
+            arena = self.arena(key)
+            for sub_pair in pair:
+                arena.append(sub_pair)
+            return
+        self.arena(key).append(pair)
+
+    # about two seconds
+    def write_cnf(self, path: str = "results/output.cnf") -> None:
+        # 512 KB buffer, adjust for your machine
+        with open(path, "w", buffering=524288) as f:
+            f.write(f"p cnf {self.current_literal} {self.total_clauses}\n")
+
+            if self.debug:
+                for comment, arena in self.clauses.items():
+                    f.write(f"c {comment} \n")
+                    arena.write(f)
+            else:
+                print("standard cnf")
+                self.clauses[None].write(f)
 
-    write_cnf()
 
+# kept for run.py and partition.py, a fresh Encoder per call so nothing leaks between runs
+def main(course_data, constraints, debug, cnf_path="results/output.cnf") -> bool:
+    encoder = Encoder(course_data, constraints, debug).encode()
+    encoder.write_cnf(cnf_path)
     return True
 
 
 if __name__ == "__main__":
     # cProfile.run("main()")
     from process_data import ProcessData
+    from datasets.registry import load_dataset
 
-    module = importlib.import_module("datasets.cs")
-    importlib.reload(module)
-    course_data = module.course_data
+    course_data = load_dataset("cs")
 
     pd = ProcessData(course_data)
     pd.process_data()
-    DATA = pd.get_data()
+    data = pd.get_data()
 
     main(
-        DATA,
+        data,
         {"99": 1, "60": 1, "45": 1, "32": 1, "30": 0},
         True,
     )
@@ -0,0 +1,128 @@
+from typing import Dict, Iterable
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, Data.option_table is None without it
+    np = None
+
+from process_data import ProcessData, pack_time
+
+"""
+Columnar copy of every course option, one row per literal.
+
+Data answers "which options are in room r" or "which options overlap MWF 9:00" with
+nested loops over dicts of sets. OptionTable holds the same options as NumPy columns so
+those questions become array selections:
+
+    table = data.option_table
+    literals = table.room_literals(data.rooms.ids["SET 101"])
+    mask, start, end = pack_time(ProcessData.calculate_time_slot("MWF0900+50"))
+    busy = literals[table.overlaps(literals, mask, start, end)]
+
+day_mask, start and end are pack_time's weekday bits and 5 minute slots since midnight,
+so overlaps is a mask AND plus an interval test on real clock times.
+row i is literal i. row 0 and the literals retired by delta.py have section -1.
+by_section / section_offsets group the live literals by section id, by_room / room_offsets by room id,
+so section_literals(s) is by_section[section_offsets[s]:section_offsets[s + 1]].
+"""
+
+COLUMNS = ("section", "room", "day_mask", "start", "end", "weight")
+
+
+class OptionTable:
+    def __init__(self, columns: Dict, num_sections: int, num_rooms: int):
+        self.section = columns["section"]
+        self.room = columns["room"]
+        self.day_mask = columns["day_mask"]
+        self.start = columns["start"]
+        self.end = columns["end"]
+        self.weight = columns["weight"]
+
+        live = np.flatnonzero(self.section >= 0).astype(np.int32)
+        self.by_section, self.section_offsets = self._group(live, self.section, num_sections)
+        self.by_room, self.room_offsets = self._group(live, self.room, num_rooms)
+
+    @staticmethod
+    def _group(literals, keys, count: int):
+        # stable sort keeps the literals of one group ascending
+        order = literals[np.argsort(keys[literals], kind="stable")]
+        offsets = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(keys[literals], minlength=count), out=offsets[1:])
+        return order, offsets
+
+    def __len__(self) -> int:
+        return len(self.section)
+
+    def section_literals(self, section_id: int):
+        return self.by_section[self.section_offsets[section_id] : self.section_offsets[section_id + 1]]
+
+    def room_literals(self, room_id: int):
+        return self.by_room[self.room_offsets[room_id] : self.room_offsets[room_id + 1]]
+
+    def overlaps(self, literals, day_mask: int, start: int, end: int):
+        """Boolean mask over literals: shares a weekday with day_mask and overlaps [start, end],
+        both in pack_time slots. Closed intervals, the same test as ProcessData.process_date_times."""
+        return (
+            ((self.day_mask[literals] & day_mask) != 0)
+            & (self.start[literals] <= end)
+            & (start <= self.end[literals])
+        )
+
+
+def build_option_table(data, course_data: Dict):
+    """OptionTable for a processed Data, or None when numpy isn't installed.
+    course_data is needed for the weights, Data doesn't keep them."""
+    if np is None:
+        return None
+    columns = {name: np.full(data.current_literal, -1, dtype=np.int32) for name in COLUMNS}
+    fill_rows(columns, data, course_data, course_data)
+    return OptionTable(columns, len(data.sections), len(data.rooms))
+
+
+def update_option_table(table: OptionTable, data, course_data: Dict, retired: Iterable[int], sections: Iterable[str]):
+    """table after a delta (see delta.py): the retired literals lose their row and only the options of
+    sections are filled in again, the old table is left as it is. None stays None."""
+    if table is None:
+        return None
+    columns = {}
+    for name in COLUMNS:
+        old = getattr(table, name)
+        columns[name] = np.full(data.current_literal, -1, dtype=np.int32)
+        columns[name][: len(old)] = old
+        columns[name][np.fromiter(retired, dtype=np.int64)] = -1
+    fill_rows(columns, data, course_data, sections)
+    return OptionTable(columns, len(data.sections), len(data.rooms))
+
+
+def fill_rows(columns: Dict, data, course_data: Dict, sections: Iterable[str]) -> None:
+    section_ids, room_ids = data.sections.ids, data.rooms.ids
+    course_to_literal = data.course_to_literal
+    rows = {name: [] for name in ("literal",) + COLUMNS}
+
+    # a few hundred distinct time strings are shared by every option
+    slots = {}
+    for section in sections:
+        section_id = section_ids.get(section)
+        if section_id is None:
+            continue
+        for room, time, weight in course_data[section]["room_times"]:
+            slot = slots.get(time)
+            if slot is None:
+                time_slot = ProcessData.calculate_time_slot(time)
+                slot = slots[time] = (time_slot, pack_time(time_slot))
+            time_slot, (mask, start, end) = slot
+
+            literal = course_to_literal.get((section, room, time_slot))
+            if literal is None:  # pruned, see ProcessData.prune_options
+                continue
+            rows["literal"].append(literal)
+            rows["section"].append(section_id)
+            rows["room"].append(room_ids[room])
+            rows["day_mask"].append(mask)
+            rows["start"].append(start)
+            rows["end"].append(end)
+            rows["weight"].append(weight)
+
+    literals = np.array(rows["literal"], dtype=np.int64)
+    for name in COLUMNS:
+        columns[name][literals] = rows[name]
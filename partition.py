@@ -0,0 +1,133 @@
+import os, traceback
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+from typing import Dict, Iterable, List
+
+from cache import cached_process_data
+from main import main
+from process_data import ProcessData
+from run import Solver
+
+"""
+Split course_data into groups of sections that share no hard/soft edges and no rooms.
+Nothing in one group can ever constrain a section in another group, so every group gets its
+own ProcessData + CNF + solver run in a separate process and the schedules are concatenated.
+
+Departments mostly end up in their own group, but a group is really a connected component:
+two departments that share a room or a soft edge stay together. A constraint above 1 is a single
+bound over every pair of its tier, so all sections on edges of such a tier end up in one group.
+"""
+
+
+class DisjointSet:
+    def __init__(self, items):
+        self.parent = {item: item for item in items}
+
+    def find(self, item):
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]  # path halving
+            item = parent[item]
+        return item
+
+    def union(self, item1, item2):
+        root1, root2 = self.find(item1), self.find(item2)
+        if root1 != root2:
+            self.parent[root2] = root1
+
+
+def partition_course_data(course_data: Dict, constraints: Dict = None) -> List[Dict]:
+    """Connected components of the section graph (hard, soft and shared rooms), largest first.
+    Every section on an edge of a tier constrained above 1 is in the same component."""
+    sets = DisjointSet(course_data)
+    bounded = {pts for pts, k in (constraints or {}).items() if k > 1}
+    room_owner, bounded_owner = {}, None
+    for section, values in course_data.items():
+        for other in chain(values["hard"], values["soft"]):
+            if other in course_data:
+                sets.union(section, other)
+                if bounded & ProcessData.pair_conflict_tiers(course_data, section, other):
+                    bounded_owner = bounded_owner or section
+                    sets.union(section, bounded_owner)
+        for room, _, _ in values["room_times"]:
+            sets.union(section, room_owner.setdefault(room, section))
+
+    groups = defaultdict(dict)
+    for section, values in course_data.items():
+        groups[sets.find(section)][section] = values
+    return sorted(groups.values(), key=len, reverse=True)
+
+
+def pack_partitions(partitions: List[Dict], bins: int) -> List[Dict]:
+    # lots of tiny components aren't worth a process each,
+    # hand the biggest remaining one to the lightest bin (sized by number of options)
+    size = lambda part: sum(len(values["room_times"]) for values in part.values())
+    packed = [({}, 0) for _ in range(min(bins, len(partitions)))]
+    for part in sorted(partitions, key=size, reverse=True):
+        i = min(range(len(packed)), key=lambda i: packed[i][1])
+        merged, total = packed[i]
+        merged.update(part)
+        packed[i] = (merged, total + size(part))
+    return [merged for merged, _ in packed if merged]
+
+
+def solve_partition(job) -> tuple:
+    index, course_data, constraints, solver_names, cnf_debug, use_cache, prune = job
+
+    if use_cache:
+        data = cached_process_data(course_data, prune=prune)
+    else:
+        pd = ProcessData(course_data, prune=prune)
+        pd.process_data()
+        data = pd.get_data()
+
+    # processed and encoded once, every solver reads the same CNF
+    os.makedirs("results", exist_ok=True)
+    cnf_path = f"results/partition_{index}.cnf"
+    main(data, constraints, cnf_debug, cnf_path=cnf_path)
+
+    # a solver that can't run (missing binary ...) is False, the other solvers still run
+    results = {}
+    for solver_name in solver_names:
+        solver = Solver(solver_name, cnf_path=cnf_path, data=data)
+        try:
+            status = solver.solve()
+        except Exception:
+            traceback.print_exc()
+            results[solver_name] = False
+            continue
+        results[solver_name] = status if status == ["UNSATISFIABLE"] else solver.get_results()
+    return results, dict(data.conflict_combinations)
+
+
+def run_partitioned(course_data: Dict, constraints: Dict, solver_names: Iterable[str], cnf_debug: bool = False,
+                    workers: int = None, use_cache: bool = True, prune: bool = False) -> tuple:
+    """Returns ({solver name: results}, conflict_combinations) merged over every partition.
+    A solver's results are ["UNSATISFIABLE"] when any partition is unsatisfiable for it,
+    otherwise False when it failed to run on any partition."""
+    workers = workers or os.cpu_count()
+    solver_names = list(solver_names)
+    partitions = pack_partitions(partition_course_data(course_data, constraints), workers)
+    print(f"{len(course_data)} sections in {len(partitions)} partitions")
+
+    jobs = [(i, part, constraints, solver_names, cnf_debug, use_cache, prune) for i, part in enumerate(partitions)]
+    results = {solver_name: [] for solver_name in solver_names}
+    conflict_combinations = defaultdict(set)
+
+    # main() builds a fresh Encoder per call, so a worker can go on to the next partition
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for part_results, part_conflicts in pool.map(solve_partition, jobs):
+            for solver_name, solver_results in part_results.items():
+                if ["UNSATISFIABLE"] in (solver_results, results[solver_name]):
+                    results[solver_name] = ["UNSATISFIABLE"]
+                elif solver_results is False or results[solver_name] is False:
+                    results[solver_name] = False
+                else:
+                    results[solver_name].extend(solver_results)
+            for pts, combination_set in part_conflicts.items():
+                conflict_combinations[pts] |= combination_set
+
+    return {
+        name: sorted(solver_results) if solver_results else solver_results for name, solver_results in results.items()
+    }, dict(conflict_combinations)
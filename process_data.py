@@ -1,13 +1,25 @@
+import sys
 from dataclasses import dataclass, field
 from collections import defaultdict
-from itertools import combinations
-from typing import TypeAlias, Tuple, Set, Dict
+from itertools import chain
+from array import array
+from heapq import heappush, heappop
+from typing import TypeAlias, Tuple, Set, Dict, FrozenSet, Hashable, Iterable, List, Sequence
 from types import MappingProxyType
 from collections.abc import Mapping
 
 # Type Aliases
 TimeKey: TypeAlias = Tuple[str, int, int]
 CRT: TypeAlias = Tuple[str, str, TimeKey]
+# (weekday bitmask, start slot, end slot) on a SLOT_MINUTES grid, see pack_time
+PackedTime: TypeAlias = Tuple[int, int, int]
+
+# 100 is a "hard" conflict, the other tiers are whatever pts values the "soft" dicts use.
+# conflict_combinations gets one bucket per tier found in the data, see conflict_tiers
+HARD_TIER = 100
+
+DAY_BITS = {day: 1 << i for i, day in enumerate("MTWRFSU")}
+SLOT_MINUTES = 5
 
 """
 The dataclass could be removed and might not be worth the computational load. 
@@ -31,62 +43,248 @@ Benefits:
 """
 
 
+class SymbolTable:
+    """Dense integer ids for sections, rooms and time keys.
+    Ids are handed out in the order keys are first seen, starting at 0.
+    The encoder only hashes these ints, names are looked up again for output and debug comments.
+    """
+
+    def __init__(self):
+        self.ids: Dict[Hashable, int] = {}
+        self.names: List[Hashable] = []
+
+    def intern(self, key: Hashable) -> int:
+        key_id = self.ids.get(key)
+        if key_id is None:
+            key_id = self.ids[key] = len(self.names)
+            self.names.append(key)
+        return key_id
+
+    def __getitem__(self, key_id: int) -> Hashable:
+        return self.names[key_id]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
 @dataclass(frozen=False)
 class Data:
+    # by name, only for reading the results back and for the tests in run.py
     conflict_combinations: Mapping[int, Set[Tuple[CRT, CRT]]] = field(default_factory=dict)
-    
-    building_room_course: Mapping[str, Dict[TimeKey, Set]] = field(default_factory=dict)
     course_to_literal: Mapping[CRT, int] = field(default_factory=dict)
-    courses_by_time: Mapping[TimeKey, Set[str]] = field(default_factory=dict)
     current_literal: int = 0
     literal_to_course: Mapping[int, CRT] = field(default_factory=dict)
 
-    section_to_crt: Mapping[str, Set[CRT]] = field(default_factory=dict)
-    time_conflicts: Mapping[TimeKey, Set[TimeKey]] = field(default_factory=dict)
-    times_by_section: Mapping[str, Set[TimeKey]] = field(default_factory=dict)
+    # sections with identical room_times share one template, see ProcessData.get_template
+    section_template: Mapping[str, int] = field(default_factory=dict)
+    templates: Tuple[Tuple[Tuple[str, TimeKey], ...], ...] = ()
+
+    # everything the encoder uses is keyed by integer ids and holds literals.
+    # sections[id], rooms[id] and times[id] translate back to the names.
+    sections: SymbolTable = field(default_factory=SymbolTable)
+    rooms: SymbolTable = field(default_factory=SymbolTable)
+    times: SymbolTable = field(default_factory=SymbolTable)
+    conflict_id_combinations: Mapping[int, Set[Tuple[int, int]]] = field(default_factory=dict)
+    literals_by_section: Mapping[int, Set[int]] = field(default_factory=dict)
+    literals_by_time: Mapping[int, Set[int]] = field(default_factory=dict)
+    room_time_literals: Mapping[int, Dict[int, Set[int]]] = field(default_factory=dict)
+    time_conflict_ids: Mapping[int, Set[int]] = field(default_factory=dict)
+    time_ids_by_section: Mapping[int, FrozenSet[int]] = field(default_factory=dict)
+    # CSR adjacency of the hard/soft edges by section id, see ProcessData.process_adjacency
+    adjacency_offsets: Sequence[int] = ()
+    adjacency_targets: Sequence[int] = ()
+    # the literal sets above as python int bitsets, see literal_bitsets. bit l is literal l, except
+    # by section: (first literal, bits from the first literal on), see section_bits
+    bits_by_section: Mapping[int, Tuple[int, int]] = field(default_factory=dict)
+    bits_by_time: Mapping[int, int] = field(default_factory=dict)
+    # every literal at a time that overlaps the key: with first, bits = bits_by_section[s]
+    # (conflict_bits_by_time[t] >> first) & bits are the options of s that clash with t in a shift and an AND
+    conflict_bits_by_time: Mapping[int, int] = field(default_factory=dict)
+    # numpy columns by literal, see option_table.py. None when numpy isn't installed
+    option_table: object = None
+    # options ProcessData(prune=True) gave no literal, by rule. see ProcessData.prune_options
+    pruned_options: Mapping[str, int] = field(default_factory=dict)
+    # room id -> maximal groups of options that overlap in that room, at most one of each group can
+    # be picked. every clashing pair in a room is inside at least one group, see room_cliques
+    room_cliques: Mapping[int, Tuple[FrozenSet[int], ...]] = field(default_factory=dict)
+
+
+# calculate_time_slot keeps HHMM * 60 as the start and adds the duration * 60 to it, so neither is
+# a real clock time. this goes back to minutes since midnight first:
+# "MWF0900+50" -> (M|W|F bits, slot 108, slot 118) with 5 minute slots.
+# the start is rounded down and the end up, so off grid times can only gain overlaps, never lose one.
+# only the option table (option_table.py) stores times this way. the indexes stay keyed per day:
+# the bitsets, conflict bits and room cliques the encoder reads need two options at one packed key
+# to share a day, which a multi-day key doesn't promise
+def pack_time(time_slot: TimeKey, slot_minutes: int = SLOT_MINUTES) -> PackedTime:
+    days, start, end = time_slot
+    mask = 0
+    for char in days:
+        mask |= DAY_BITS[char]
+    hours, minutes = divmod(start // 60, 100)
+    start_minutes = hours * 60 + minutes
+    end_minutes = start_minutes + (end - start) // 60
+    return (mask, start_minutes // slot_minutes, -(-end_minutes // slot_minutes))
+
+
+# how many levels of dicts each index has above its sets, 0 means the values aren't sets
+INDEX_DEPTHS = {
+    "conflict_combinations": 1, "course_to_literal": 0, "literal_to_course": 0, "section_template": 0,
+    "conflict_id_combinations": 1, "literals_by_section": 1, "literals_by_time": 1,
+    "room_time_literals": 2, "time_conflict_ids": 1, "time_ids_by_section": 1,
+}
+
+
+def freeze_index(index: Mapping, depth: int = 1) -> MappingProxyType:
+    """Read only view of a dict (of dicts) of sets. The dict itself is reused and its sets are
+    swapped for frozensets in place, so nothing is copied and nothing in Data can be altered.
+    A defaultdict loses its default_factory first, looking up a missing key must not insert it."""
+    if isinstance(index, MappingProxyType):
+        return index
+    if isinstance(index, defaultdict):
+        index.default_factory = None
+    if depth > 0:
+        for key, value in index.items():
+            index[key] = freeze_index(value, depth - 1) if depth > 1 else frozenset(value)
+    return MappingProxyType(index)
+
+
+def build_adjacency(course_data: Dict, section_ids: Dict[str, int]) -> Tuple[array, array]:
+    neighbours = [set() for _ in range(len(section_ids))]
+    for section, values in course_data.items():
+        section_id = section_ids[section]
+        for other in chain(values["hard"], values["soft"]):
+            other_id = section_ids.get(other)
+            # edges to sections that aren't in the dataset can't conflict with anything
+            if other_id is not None and other_id != section_id and other in course_data:
+                neighbours[section_id].add(other_id)
+                neighbours[other_id].add(section_id)
+
+    offsets, targets = array("i", [0]), array("i")
+    for section_targets in neighbours:
+        targets.extend(sorted(section_targets))
+        offsets.append(len(targets))
+    return offsets, targets
+
+
+def to_bits(literals: Iterable[int], size: int) -> int:
+    # setting bits in a bytearray and converting once is linear, or-ing 1 << l copies the int every time
+    buffer = bytearray((size >> 3) + 1)
+    for literal in literals:
+        buffer[literal >> 3] |= 1 << (literal & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def from_bits(bits: int, first: int = 0) -> List[int]:
+    # first is what bit 0 stands for, see section_bits
+    literals = []
+    while bits:
+        low = bits & -bits
+        literals.append(low.bit_length() - 1 + first)
+        bits ^= low
+    return literals
+
+
+# a section's literals are one contiguous range (see literal_order), so its bitset starts at its first
+# literal instead of at 0. an absolute int would be as wide as the section's last literal,
+# sections x literals bits overall. (conflict_bits >> first) & bits lines a time up with it
+def section_bits(literals: Iterable[int]) -> Tuple[int, int]:
+    literals = list(literals)
+    if not literals:
+        return (0, 0)
+    first = min(literals)
+    return (first, to_bits([literal - first for literal in literals], max(literals) - first))
+
+
+def literal_bitsets(literals_by_section: Mapping, literals_by_time: Mapping,
+                    time_conflict_ids: Mapping, size: int) -> Tuple[Dict, Dict, Dict]:
+    """(bits_by_section, bits_by_time, conflict_bits_by_time), see Data"""
+    bits_by_section = {key: section_bits(literals) for key, literals in literals_by_section.items()}
+    bits_by_time = {key: to_bits(literals, size) for key, literals in literals_by_time.items()}
+    conflict_bits_by_time = {
+        time_id: conflict_bits(time_id, time_conflict_ids, bits_by_time) for time_id in bits_by_time}
+    return bits_by_section, bits_by_time, conflict_bits_by_time
+
+
+# one entry of conflict_bits_by_time, delta.py only redoes the times next to the ones it changed
+def conflict_bits(time_id: int, time_conflict_ids: Mapping, bits_by_time: Mapping) -> int:
+    bits = 0
+    for other in time_conflict_ids.get(time_id, ()):
+        bits |= bits_by_time.get(other, 0)
+    return bits
+
+
+def conflict_tiers(course_data: Dict) -> Tuple[int, ...]:
+    # HARD_TIER and every pts value in the data, highest first. the encoder walks the tiers in this order
+    tiers = {HARD_TIER}
+    for values in course_data.values():
+        tiers.update(values["soft"].values())
+    return tuple(sorted(tiers, reverse=True))
+
 
 class ProcessData:
-    def __init__(self, course_data: Dict):
+    def __init__(self, course_data: Dict, prune: bool = False):
         self.all_times = defaultdict(set)
         self.all_sections: Set[str] = set()  # all course names "CS 2420-01"
-        self.ampm_day_time: dict[tuple[int, str], set] = defaultdict(set)
-        self.building_room_course = defaultdict(lambda: defaultdict(set))
-
-        self.conflict_combinations = {
-            100: set(),
-            99: set(),
-            60: set(),
-            45: set(),
-            32: set(),
-            30: set(),
-        }
+        self.day_times: dict[str, set[tuple[int, int]]] = defaultdict(set)
+
+        self.conflict_combinations = {pts: set() for pts in conflict_tiers(course_data)}
 
         self.course_data = course_data
-        self.courses_by_time = defaultdict(set)
         self.course_to_literal: dict[CRT, int] = defaultdict(int)
         self.current_literal = 1
         self.data = None
 
         self.literal_to_course: dict[int, CRT] = defaultdict(CRT)
-        self.section_to_crt: dict[str, set[CRT]] = defaultdict(set)
+        self.section_template: dict[str, int] = {}
+        # template id -> ((room, time slot, per day time keys), ...)
+        self.templates: list[tuple] = []
+        self.template_ids: dict[frozenset, int] = {}
+        # time string -> (time slot, per day time keys)
+        self.time_slots: dict[str, tuple] = {}
+        # by time key while building, Data only keeps time_conflict_ids
         self.time_conflicts = defaultdict(set)
-        self.times_by_section = defaultdict(set)
 
-    def set_data(self):
+        # integer ids, see SymbolTable
+        self.sections = SymbolTable()
+        self.rooms = SymbolTable()
+        self.times = SymbolTable()
+        self.conflict_id_combinations = {pts: set() for pts in self.conflict_combinations}
+        self.literals_by_section: dict[int, set[int]] = defaultdict(set)
+        self.literals_by_time: dict[int, set[int]] = defaultdict(set)
+        self.room_time_literals = defaultdict(lambda: defaultdict(set))
+        self.template_time_ids: list[frozenset[int]] = []
+        self.time_conflict_ids: dict[int, set[int]] = defaultdict(set)
+        self.time_ids_by_section: dict[int, frozenset[int]] = {}
+        self.adjacency_offsets = array("i", [0])
+        self.adjacency_targets = array("i")
+        # section -> room_times without the options that can never be picked, see prune_options
+        self.prune = prune
+        self.pruned_room_times: dict[str, set] = {}
+        self.pruned_options = {"duplicates": 0, "room": 0, "hard": 0}
 
+    def set_data(self):
+        # the builders are frozen in place, no index is copied. see freeze_index
         self.data = Data(
-            conflict_combinations = MappingProxyType(dict(self.conflict_combinations)),
-            building_room_course = MappingProxyType(dict(self.building_room_course)),
-           
-            course_to_literal = MappingProxyType(dict(self.course_to_literal)),
-            courses_by_time = MappingProxyType(dict(self.courses_by_time)),
+            **{name: freeze_index(getattr(self, name), depth) for name, depth in INDEX_DEPTHS.items()},
             current_literal = self.current_literal,
-
-            literal_to_course = MappingProxyType(dict(self.literal_to_course)),
-            section_to_crt = MappingProxyType(dict(self.section_to_crt)),
-            time_conflicts = MappingProxyType(dict(self.time_conflicts)),
-            times_by_section = MappingProxyType(dict(self.times_by_section)),
+            pruned_options = MappingProxyType(self.pruned_options),
+            templates = tuple(
+                tuple((room, time_slot) for room, time_slot, *_ in options) for options in self.templates),
+            sections = self.sections,
+            rooms = self.rooms,
+            times = self.times,
+            adjacency_offsets = self.adjacency_offsets,
+            adjacency_targets = self.adjacency_targets,
         )
+        self.data.bits_by_section, self.data.bits_by_time, self.data.conflict_bits_by_time = (
+            MappingProxyType(bits) for bits in literal_bitsets(
+                self.data.literals_by_section, self.data.literals_by_time, self.data.time_conflict_ids,
+                self.current_literal))
+        # option_table.py imports this module
+        from option_table import build_option_table
+        self.data.option_table = build_option_table(self.data, self.course_data)
+        self.data.room_cliques = MappingProxyType(room_cliques(self.data.room_time_literals, self.times))
         all = defaultdict(set)
         total = 0
         for day, times in self.all_times.items():
@@ -99,21 +297,97 @@ class ProcessData:
 
     def get_data(self):
         return self.data
-    
+
 
     def process_data(self):
-        for section1, section2 in combinations(self.course_data.keys(), 2):
-            if section1 not in self.all_sections:
-                self.process_one_section(section1)
-            if section2 not in self.all_sections:
-                self.process_one_section(section2)
-                            
-            self.process_conflicts(min(section1, section2), max(section1, section2))
-        
+        if self.prune:
+            self.prune_options()
+        for section in self.course_data:
+            if section not in self.all_sections:
+                self.process_one_section(section)
+
+        # only pairs joined by a "hard" or "soft" edge can ever conflict,
+        # so walk the edges instead of every combination of sections (n^2)
+        self.process_adjacency()
+        names, offsets, targets = self.sections.names, self.adjacency_offsets, self.adjacency_targets
+        for section_id, section1 in enumerate(names):
+            for i in range(offsets[section_id], offsets[section_id + 1]):
+                if targets[i] > section_id:  # every edge is stored in both directions
+                    section2 = names[targets[i]]
+                    self.process_conflicts(min(section1, section2), max(section1, section2))
+
         self.process_date_times()
+        self.process_ids()
         self.set_data()
+        self.release_builders()
         return True
-    
+
+
+    # Data now owns the frozen indexes, drop everything else that was only needed while building
+    # (templates by room_times, parsed times, per day intervals ...) so it can be garbage collected
+    def release_builders(self):
+        for name in list(vars(self)):
+            if name not in ("course_data", "data"):
+                delattr(self, name)
+
+
+    # Options that can never be picked get no literal, so they cost no variables or clauses in main.py.
+    # Repeated until nothing changes:
+    #   duplicates  the same room and time listed twice (with another weight)
+    #   room        a section with a single option is pinned, no other section can use that room
+    #               at an overlapping time
+    #   hard        no hard linked section can be at an overlapping time either, in any room.
+    #               only sound when hard conflicts are encoded with k = 1, like run_main does
+    # A section never loses its last option, an impossible schedule is left for the solver to report.
+    def prune_options(self) -> None:
+        options: dict[str, dict] = {}
+        by_room: dict[str, dict] = defaultdict(dict)  # room -> sections using it, in section order
+        for section, values in self.course_data.items():
+            kept = options[section] = {}
+            parsed = parse_room_times(values["room_times"], self.time_slots)
+            for entry, (room, time_slot, _) in zip(values["room_times"], parsed):
+                if (room, time_slot) in kept:
+                    self.pruned_options["duplicates"] += 1
+                    continue
+                kept[(room, time_slot)] = entry
+                by_room[room][section] = None
+
+        hard = defaultdict(dict)
+        for section, values in self.course_data.items():
+            for other in values["hard"]:
+                if other in options and other != section:
+                    hard[section][other] = None
+                    hard[other][section] = None
+
+        pinned = [section for section, kept in options.items() if len(kept) == 1]
+        done = set()
+        while pinned:
+            section = pinned.pop()
+            if section in done:
+                continue
+            done.add(section)
+            (room, time_slot), = options[section]
+
+            rules = [(other, "room") for other in by_room[room]] + [(other, "hard") for other in hard[section]]
+            for other, rule in rules:
+                if other == section:
+                    continue
+                kept = options[other]
+                blocked = [key for key in kept
+                           if (rule == "hard" or key[0] == room) and slots_overlap(key[1], time_slot)]
+                if not blocked or len(blocked) == len(kept):
+                    continue
+                for key in blocked:
+                    del kept[key]
+                self.pruned_options[rule] += len(blocked)
+                if len(kept) == 1:
+                    pinned.append(other)
+
+        for section, values in self.course_data.items():
+            if len(options[section]) < len(values["room_times"]):
+                self.pruned_room_times[section] = set(options[section].values())
+        print(f"pruned {sum(self.pruned_options.values())} options: {self.pruned_options}")
+
 
     def assign_literals(self, course_key: CRT) -> None:
         self.course_to_literal[course_key] = self.current_literal
@@ -123,7 +397,8 @@ class ProcessData:
     
 
     # format "("Smith 107", "MWF1000+150", 0)" to a tuple (days, start time, end time)
-    def calculate_time_slot(self, time: str) -> TimeKey:
+    @staticmethod
+    def calculate_time_slot(time: str) -> TimeKey:
         x = time.index("+")
         days = time[: x - 4]
         start = int(time[x - 4 : x]) * 60
@@ -131,70 +406,234 @@ class ProcessData:
         return (days, start, start + end)
 
 
+    # Large groups of sections offer exactly the same room_times (every MTWR lab for example).
+    # The time strings of each distinct set are only parsed and indexed once,
+    # sections just keep the id of their template.
+    def get_template(self, room_times) -> int:
+        key = frozenset(room_times)
+        template_id = self.template_ids.get(key)
+        if template_id is not None:
+            return template_id
+
+        template_id = len(self.templates)
+        self.template_ids[key] = template_id
+        options = []
+        times = set()
+        # literals are handed out in this order, see literal_order
+        for room, time_slot, char_times in sorted(parse_room_times(room_times, self.time_slots), key=literal_order):
+            time_ids = tuple(self.times.intern(char_time) for char_time in char_times)
+            options.append((room, time_slot, char_times, self.rooms.intern(room), time_ids))
+
+            for char, start, end in char_times:
+                times.add((char, start, end))
+                self.all_times[char].add(start)
+                self.all_times[char].add(end)
+                self.day_times[char].add((start, end))
+
+        self.templates.append(tuple(options))
+        self.template_time_ids.append(frozenset(self.times.ids[time] for time in times))
+        return template_id
+
+
     def process_one_section(self, section):
         self.all_sections.add(section)
-        for room, time, _ in self.course_data[section]["room_times"]:
-            time_slot = self.calculate_time_slot(time)
-            course_key = (section, room, time_slot)
+        room_times = self.pruned_room_times.get(section, self.course_data[section]["room_times"])
+        template_id = self.get_template(room_times)
+        self.section_template[section] = template_id
+        section_id = self.sections.intern(section)
+        self.time_ids_by_section[section_id] = self.template_time_ids[template_id]
 
-            self.assign_literals(course_key)
+        for building_room, time_slot, char_times, room_id, time_ids in self.templates[template_id]:
+            course_key = (section, building_room, time_slot)
 
-            section, building_room, time = course_key
-            days = time[0]
-            self.section_to_crt[section].add(course_key)
+            literal = self.current_literal
+            self.assign_literals(course_key)
+            self.literals_by_section[section_id].add(literal)
 
-            for char in set(days):
-                char_time = (char, time[1], time[2])
-                self.building_room_course[building_room][char_time].add(course_key)
-                self.courses_by_time[char_time].add(course_key)
-                self.times_by_section[section].add(char_time)
-                self.all_times[char].add(time[1])
-                self.all_times[char].add(time[2])
-                if time[1] <= 72000:
-                    self.ampm_day_time[(0, char)].add(tuple([time[1], time[2]]))
-                if time[2] >= 72000:
-                    self.ampm_day_time[(1, char)].add(tuple([time[1], time[2]]))
+            for time_id in time_ids:
+                self.room_time_literals[room_id][time_id].add(literal)
+                self.literals_by_time[time_id].add(literal)
 
 
     def process_date_times(self):
-        for ampmday, times in self.ampm_day_time.items():
-            day = ampmday[1]
-            if len(times) == 1:
-                time = next(iter(times))
-                start, end = time
-                self.time_conflicts[(day, start, end)].add((day, start, end))
-                continue
+        # times are keyed by day, so the days never share a key
+        for day, times in self.day_times.items():
+            self.time_conflicts.update(sweep_day(day, times))
+
+
+    # symmetric, deduplicated CSR adjacency of the hard and soft edges by section id:
+    # the neighbours of section i are adjacency_targets[adjacency_offsets[i]:adjacency_offsets[i + 1]]
+    def process_adjacency(self):
+        self.adjacency_offsets, self.adjacency_targets = build_adjacency(self.course_data, self.sections.ids)
+
+
+    # conflicts are only known once every section has been seen, translate them to ids afterwards
+    def process_ids(self):
+        section_ids, time_ids = self.sections.ids, self.times.ids
+        for time, conflicts in self.time_conflicts.items():
+            self.time_conflict_ids[time_ids[time]] = {time_ids[other] for other in conflicts}
 
-            for time1, time2 in combinations(times, 2):
+        for pts, combination_set in self.conflict_combinations.items():
+            self.conflict_id_combinations[pts] = {
+                (section_ids[section1], section_ids[section2]) for section1, section2 in combination_set
+            }
 
-                start1, end1 = time1
-                start2, end2 = time2
-                time1 = (day, time1[0], time1[1])
-                time2 = (day, time2[0], time2[1])
-                self.time_conflicts[time1].add(time1)
-                self.time_conflicts[time2].add(time2)
 
-                if (start1 <= start2 <= end1) or (start2 <= start1 <= end2):
-                    self.time_conflicts[time1].add(time2)
-                    self.time_conflicts[time2].add(time1)
+    # every tier the pair belongs to, classified once per edge: one hard test and one soft lookup
+    # per direction, whatever the number of tiers. also used by delta.py for the pairs of a single section
+    @staticmethod
+    def pair_conflict_tiers(course_data: Dict, section1: str, section2: str) -> Set[int]:
+        values1, values2 = course_data[section1], course_data[section2]
+        tiers = set()
+        if section2 in values1["hard"] or section1 in values2["hard"]:
+            tiers.add(HARD_TIER)
+        for pts in (values1["soft"].get(section2), values2["soft"].get(section1)):
+            if pts is not None:
+                tiers.add(pts)
+        return tiers
 
 
     def process_conflicts(self, section1, section2):
+        for pts in self.pair_conflict_tiers(self.course_data, section1, section2):
+            self.conflict_combinations[pts].add((section1, section2))
 
-        for conflict_type, combinations in self.conflict_combinations.items():
-            if ( section2 in self.course_data.get(section1)["hard"]
-                or section1 in self.course_data.get(section2)["hard"]
-            ):
-                self.conflict_combinations[100].add((section1, section2))
-            
-            if (
-                self.course_data[section1]["soft"].get(section2) == conflict_type
-                or self.course_data[section2]["soft"].get(section1) == conflict_type
-            ):
-                combinations.add((section1, section2))
+def char_times(time_slot: TimeKey) -> Tuple[TimeKey, ...]:
+    # ("MWF", 540, 590) -> one key per weekday, in the order the days are written
+    days, start, end = time_slot
+    return tuple((char, start, end) for char in dict.fromkeys(days))
+
+
+# Literal numbering: sections get consecutive literals in course_data order, and inside a section
+# options are numbered by start time, end time, days and then room. Options at the same time sit
+# next to each other, so the room and time clauses of a section touch a narrow range of variables.
+# The order only depends on the data, never on set iteration, so the numbering is the same every run.
+def literal_order(option: tuple) -> tuple:
+    room, (days, start, end), *_ = option
+    return (start, end, days, room)
+
+
+def slots_overlap(time_slot1: TimeKey, time_slot2: TimeKey) -> bool:
+    # the closed interval test of sweep_day, on any day the two have in common
+    return (time_slot1[1] <= time_slot2[2] and time_slot2[1] <= time_slot1[2]
+            and not set(time_slot1[0]).isdisjoint(time_slot2[0]))
+
+
+def parse_time(time: str) -> Tuple[TimeKey, Tuple[TimeKey, ...]]:
+    time_slot = ProcessData.calculate_time_slot(time)
+    return time_slot, char_times(time_slot)
+
+
+def parse_room_times(room_times: Iterable, time_slots: Dict[str, tuple]) -> List[Tuple[str, TimeKey, Tuple[TimeKey, ...]]]:
+    # (room, time slot, per day time keys) for every option, in the order room_times iterates.
+    # a dataset only has a few hundred distinct time strings, time_slots keeps each one parsed once
+    # (calculate_time_slot was called once per option before, ~30% of ProcessData on 10x)
+    parsed = []
+    for room, time, _ in room_times:
+        slot = time_slots.get(time)
+        if slot is None:
+            slot = time_slots[time] = parse_time(time)
+        parsed.append((room, *slot))
+    return parsed
+
+
+# sweep one day's intervals by start time. the heap holds the intervals still open,
+# once an interval ends before the current start it can't overlap anything after it either.
+# whatever is left in the heap overlaps the current interval (closed intervals, so touching counts)
+# and every time conflicts with itself. O(n log n + number of overlapping pairs)
+def sweep_day(day: str, times: Iterable[Tuple[int, int]]) -> Dict[TimeKey, Set[TimeKey]]:
+    time_conflicts = {}
+    active = []
+    for start, end in sorted(times):
+        time = (day, start, end)
+        while active and active[0][0] < start:
+            heappop(active)
+
+        conflicts = time_conflicts[time] = {time}
+        for _, other in active:
+            conflicts.add(other)
+            time_conflicts[other].add(time)
+        heappush(active, (end, time))
+    return time_conflicts
+
+
+# the times offered in a room form an interval graph per weekday, its maximal cliques come out of
+# one sweep: the times still running just before one ends (after something new started) all overlap
+# and no other time overlaps all of them. closed intervals, the same test as sweep_day.
+# a clique is kept as the literals of its times, groups repeated on other days are only kept once
+def room_cliques(room_time_literals: Mapping, times: SymbolTable) -> Dict[int, Tuple[FrozenSet[int], ...]]:
+    cliques = {}
+    for room_id, room_times in room_time_literals.items():
+        days = defaultdict(list)
+        for time_id in room_times:
+            day, start, end = times[time_id]
+            days[day].append((start, end, time_id))
+
+        groups = {}
+        for day in sorted(days):
+            active, grown = [], False
+            for start, end, time_id in sorted(days[day]):
+                if active and active[0][0] < start:
+                    if grown:
+                        groups.setdefault(room_clique(active, room_times), None)
+                        grown = False
+                    while active and active[0][0] < start:
+                        heappop(active)
+                heappush(active, (end, time_id))
+                grown = True
+            if grown:
+                groups.setdefault(room_clique(active, room_times), None)
+        # a lone option can't clash with anything
+        cliques[room_id] = tuple(group for group in groups if len(group) > 1)
+    return cliques
+
+
+def room_clique(active: List[Tuple[int, int]], room_times: Mapping) -> FrozenSet[int]:
+    return frozenset(chain.from_iterable(room_times[time_id] for _, time_id in active))
+
+
+def memory_report(data: Data) -> Dict[str, int]:
+    """Bytes held by each field of data, following containers down to the ints and strings.
+    Objects shared between fields (section names, CRT tuples ...) are counted for the first field only."""
+    seen = set()
+    report = {}
+    for name in Data.__dataclass_fields__:
+        size = 0
+        stack = [getattr(data, name)]
+        while stack:
+            obj = stack.pop()
+            if id(obj) in seen:
+                continue
+            seen.add(id(obj))
+            size += sys.getsizeof(obj)
+            if isinstance(obj, MappingProxyType):
+                # count the dict it wraps instead, a shallow copy is the same size. the copy is only
+                # measured, never walked: once freed its id would be reused and skipped as seen
+                size += sys.getsizeof(dict(obj)) - sys.getsizeof(obj)
+            if isinstance(obj, Mapping):
+                stack.extend(obj.keys())
+                stack.extend(obj.values())
+            elif isinstance(obj, (tuple, list, set, frozenset)):
+                stack.extend(obj)
+            elif hasattr(obj, "__dict__"):  # SymbolTable, OptionTable ...
+                stack.extend(vars(obj).values())
+        report[name] = size
+    return report
 
 
 if __name__ == "__main__":
-    pass
-    # pd = ProcessData()
-    # pd.process_data()
+    # python process_data.py cset
+    import tracemalloc
+    import option_table  # imported up front so numpy isn't part of the report
+    from datasets.registry import load_dataset
+
+    course_data = load_dataset(sys.argv[1] if len(sys.argv) > 1 else "cs")
+    tracemalloc.start()
+    pd = ProcessData(course_data)
+    pd.process_data()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    for name, size in sorted(memory_report(pd.get_data()).items(), key=lambda item: -item[1]):
+        if size:
+            print(f"{name:<26} {size / 2**20:8.2f} MB")
+    print(f"retained {current / 2**20:.2f} MB, peak {peak / 2**20:.2f} MB")
@@ -1,9 +1,13 @@
-import os, pstats, cProfile, subprocess, importlib, traceback, logging, unittest
+import os, pstats, cProfile, subprocess, traceback, logging, unittest
 from contextlib import contextmanager
 from typing import Iterator
 from main import main
 from pretty import pretty_main as pretty_main
-from process_data import ProcessData
+from types import MappingProxyType
+from process_data import HARD_TIER, ProcessData, Data, conflict_tiers
+from datasets.registry import load_dataset
+from datasets.validate import validate_course_data
+from cache import cached_process_data
 from test import TestResults
 
 DATA = None
@@ -21,8 +25,11 @@ class Solver:
     However, by using the parser it translates the output back into the course data
     """
 
-    def __init__(self, solver):
+    def __init__(self, solver, cnf_path="results/output.cnf", data=None):
         self.solver = solver
+        self.cnf_path = cnf_path
+        # partitioned runs solve many small Data objects, see partition.py
+        self.data = data
         self.results = []
         self.capturing = False
         self.num_lines = 0
@@ -53,7 +60,7 @@ class Solver:
     def managed_process(self) -> Iterator[subprocess.Popen[str]]:
 
         process = subprocess.Popen(
-            [self.solver, "results/output.cnf"],
+            [self.solver, self.cnf_path],
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
             text=True,
@@ -69,8 +76,9 @@ class Solver:
 
     def get_results(self) -> list:
         course_list = []
+        data = self.data if self.data is not None else DATA
         for line in self.results:
-            course = DATA.literal_to_course.get(int(line))
+            course = data.literal_to_course.get(int(line))
             if course:
                 course_list.append(course)
         return sorted(course_list)
@@ -146,18 +154,44 @@ def run_tests(constraints, raw_data):
     runner.run(suite)
 
 
-def run_main(data: str, constraints: dict, tests: list, cnf_debug: bool) -> None:
+def run_main(data: str, constraints: dict, tests: list, cnf_debug: bool, use_cache: bool = True,
+             workers: int = 1, prune: bool = False) -> None:
     global DATA
     print(f"\nconstraints: {constraints}\ntests: {tests}\n")
 
-    module = importlib.import_module(data)
-    importlib.reload(module)
-    raw_data = module.course_data
+    # data is a dataset name, module name or a line oriented export (.jsonl / .csv)
+    # it is only loaded again when its files changed, see datasets/registry.py
+    raw_data = load_dataset(data)
 
+    # catch bad data before any of the expensive phases, see datasets/validate.py
+    problems = validate_course_data(raw_data)
+    if problems:
+        for location, message in problems:
+            logging.error(f"{data}: {location}: {message}")
+        return
+
+    # the tiers come from the data, every one of them needs a constraint (0 leaves it unconstrained)
+    missing = [pts for pts in conflict_tiers(raw_data) if pts not in constraints]
+    if missing:
+        logging.error(f"{data}: no constraint for the pts tiers {missing}, constraints: {constraints}")
+        return
+
+    # dropping options next to a hard linked, pinned section is only sound when hard conflicts are exclusive
+    if prune and constraints.get(HARD_TIER) != 1:
+        logging.warning(f"not pruning, the hard constraint is {constraints.get(HARD_TIER)} instead of 1")
+        prune = False
+
+    if workers > 1:
+        run_partitioned_main(raw_data, constraints, cnf_debug, workers, use_cache, prune)
+        return
 
-    pd = ProcessData(raw_data)
-    pd.process_data()
-    DATA = pd.get_data()
+    # ProcessData output only depends on raw_data, reuse it from .cache/ when possible
+    if use_cache:
+        DATA = cached_process_data(raw_data, prune=prune)
+    else:
+        pd = ProcessData(raw_data, prune=prune)
+        pd.process_data()
+        DATA = pd.get_data()
 
 
     if not DATA:
@@ -197,6 +231,34 @@ def run_main(data: str, constraints: dict, tests: list, cnf_debug: bool) -> None
     run_tests(constraints, raw_data)
 
 
+def run_partitioned_main(raw_data: dict, constraints: dict, cnf_debug: bool, workers: int,
+                         use_cache: bool = True, prune: bool = False) -> None:
+    """Same as run_main, but sections that share no edges or rooms are
+    processed, encoded and solved in separate processes, see partition.py"""
+    global DATA
+    from partition import run_partitioned
+
+    # every partition is processed and encoded once and then solved by each solver
+    all_results, conflict_combinations = run_partitioned(
+        raw_data, constraints, SOLVERS.keys(), cnf_debug, workers, use_cache, prune)
+    for solver_name, results in all_results.items():
+        print(f"\nsolver: {solver_name}:")
+        if results is False:
+            logging.error(f"solver: {solver_name} failed on at least one partition, see the traceback above")
+            continue
+        if "UNSATISFIABLE" in results:
+            print("UNSATISFIABLE")
+            continue
+
+        print(f"running tests and printing results.")
+        pretty_main(results)
+        SOLVERS[solver_name] = results
+
+    # the tests only need the merged conflict pairs, not a full Data
+    DATA = Data(conflict_combinations=MappingProxyType(conflict_combinations))
+    run_tests(constraints, raw_data)
+
+
 def cleanup_files():
     """At the very end, clean up any files created during the run."""
     files_to_cleanup = ["results/output.cnf",]
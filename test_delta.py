@@ -0,0 +1,108 @@
+import unittest
+from collections import Counter
+from delta import apply_delta
+from datasets.registry import load_dataset
+from option_table import build_option_table
+from process_data import ProcessData, literal_bitsets, room_cliques
+
+"""
+apply_delta against a full ProcessData run on the same changed course_data.
+Literal numbers differ between the two, so everything is compared by section, room and time names.
+
+    python -m unittest test_delta
+"""
+
+
+def process(course_data):
+    pd = ProcessData(course_data)
+    pd.process_data()
+    return pd.get_data()
+
+
+def by_name(data):
+    course, times = data.literal_to_course, data.times
+    courses = lambda literals: Counter(course[literal] for literal in literals)
+    used = set().union(*data.time_ids_by_section.values())
+    return {
+        "options": Counter(course.values()),
+        "literals_by_section": {data.sections[s]: courses(ls) for s, ls in data.literals_by_section.items()},
+        "literals_by_time": {times[t]: courses(ls) for t, ls in data.literals_by_time.items() if ls},
+        "room_time_literals": {
+            (data.rooms[r], times[t]): courses(ls)
+            for r, by_time in data.room_time_literals.items() for t, ls in by_time.items() if ls},
+        "time_ids_by_section": {data.sections[s]: {times[t] for t in ts} for s, ts in data.time_ids_by_section.items()},
+        # a delta keeps times no option uses any more, they don't matter
+        "time_conflict_ids": {
+            times[t]: {times[other] for other in others if other in used}
+            for t, others in data.time_conflict_ids.items() if t in used},
+        "conflict_combinations": {pts: set(pairs) for pts, pairs in data.conflict_combinations.items()},
+        "conflict_id_combinations": {
+            pts: {(data.sections[s1], data.sections[s2]) for s1, s2 in pairs}
+            for pts, pairs in data.conflict_id_combinations.items()},
+        "room_cliques": {
+            data.rooms[r]: sorted(sorted(Counter(course[literal] for literal in clique).items()) for clique in cliques)
+            for r, cliques in data.room_cliques.items() if cliques},
+    }
+
+
+class TestApplyDelta(unittest.TestCase):
+    def check(self, course_data, delta):
+        data = process(course_data)
+        new_data, new_course_data = apply_delta(data, course_data, delta)
+        full_data = process(new_course_data)
+        expected = by_name(full_data)
+        actual = by_name(new_data)
+        for name in expected:
+            self.assertEqual(actual[name], expected[name], name)
+        # the encoder walks the tiers in this order, it numbers the k > 1 aux literals
+        self.assertEqual(list(new_data.conflict_id_combinations), list(full_data.conflict_id_combinations))
+
+        # the patched bitsets and table are the ones a full build would give for new_data's literals
+        bits = literal_bitsets(
+            new_data.literals_by_section, new_data.literals_by_time, new_data.time_conflict_ids,
+            new_data.current_literal)
+        self.assertEqual(
+            (dict(new_data.bits_by_section), dict(new_data.bits_by_time), dict(new_data.conflict_bits_by_time)),
+            tuple(dict(index) for index in bits))
+        self.assertEqual(
+            {r: sorted(map(sorted, cliques)) for r, cliques in new_data.room_cliques.items()},
+            {r: sorted(map(sorted, cliques)) for r, cliques in room_cliques(new_data.room_time_literals, new_data.times).items()})
+        if new_data.option_table is not None:
+            table = build_option_table(new_data, new_course_data)
+            for name in ("section", "room", "day_mask", "start", "end", "weight", "by_section", "by_room"):
+                self.assertEqual(getattr(new_data.option_table, name).tolist(), getattr(table, name).tolist(), name)
+
+    def test_cs(self):
+        course_data = load_dataset("cs")
+        sections = sorted(course_data)
+        moved, linked, other, removed = sections[3], sections[10], sections[20], sections[5]
+        self.check(course_data, {
+            "sections": {
+                moved: {"room_times": {("NEW 1", "MWF0815+50", 0), ("Smith 107", "TR0905+75", 0)}},
+                linked: {"soft": {other: 99}, "hard": set(course_data[linked]["hard"]) | {sections[30]}},
+                "ZZ 1000-01": {"room_times": {("Smith 107", "MW0900+75", 0)}, "hard": {moved}, "soft": {linked: 32}},
+            },
+            "remove": [removed],
+        })
+
+    def test_edges_only(self):
+        course_data = load_dataset("cs")
+        sections = sorted(course_data)
+        self.check(course_data, {"sections": {sections[0]: {"soft": {sections[1]: 60}}}})
+        # a pts value the data didn't have gets its own tier
+        self.check(course_data, {"sections": {sections[0]: {"soft": {sections[1]: 75}}}})
+
+    def test_duplicate_options(self):
+        # the same room and time twice with different weights, ProcessData gives it two literals
+        course_data = {
+            "A": {"room_times": {("R1", "MWF0900+50", 0), ("R1", "MWF0900+50", 5)}, "hard": set(), "soft": {"B": 99}},
+            "B": {"room_times": {("R1", "MWF0900+50", 0), ("R2", "TR1030+75", 0)}, "hard": set(), "soft": {}},
+            "C": {"room_times": {("R2", "MWF0930+50", 0)}, "hard": {"A"}, "soft": {}},
+        }
+        self.check(course_data, {"remove": ["A"]})
+        self.check(course_data, {"sections": {"A": {"room_times": {("R2", "MWF0900+50", 0)}}}})
+        self.check(course_data, {"sections": {"B": {"room_times": {("R1", "TR0900+75", 0), ("R1", "TR0900+75", 3)}}}})
+
+
+if __name__ == "__main__":
+    unittest.main()
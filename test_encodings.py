@@ -0,0 +1,86 @@
+import unittest
+from itertools import combinations
+from pysat.solvers import Cadical153
+from clauses import ClauseArena
+from incidence import sparse
+from main import Encoder
+from process_data import Data, ProcessData
+from datasets.registry import load_dataset
+
+"""
+The larger at-most-one encodings in main.py against a solver.
+Every group must allow no literal and any single literal, and rule out every pair.
+The k = 1 time conflict clauses must be exactly the pairs of options whose times overlap.
+
+    python -m unittest test_encodings
+"""
+
+SIZES = (1, 2, 5, 6, 7, 31, 32, 33, 50, 143)
+
+
+class TestAtMostOne(unittest.TestCase):
+    def check(self, encode, size: int):
+        literals = list(range(1, size + 1))
+        encoder = Encoder(Data(current_literal=size + 1), {}, debug=False)
+        arena = ClauseArena()
+        encode(encoder, literals, arena)
+
+        with Cadical153(bootstrap_with=[list(clause) for clause in arena]) as solver:
+            self.assertTrue(solver.solve(assumptions=[-literal for literal in literals]), f"none true, size {size}")
+            for literal in literals:
+                others = [-other for other in literals if other != literal]
+                self.assertTrue(solver.solve(assumptions=[literal] + others), f"{literal} true, size {size}")
+            for literal1, literal2 in combinations(literals, 2):
+                self.assertFalse(solver.solve(assumptions=[literal1, literal2]), f"{literal1} and {literal2}, size {size}")
+
+    def test_sequential(self):
+        for size in SIZES:
+            self.check(Encoder.sequential_group, size)
+
+    def test_product(self):
+        for size in SIZES:
+            self.check(Encoder.product_group, size)
+
+    def test_by_size(self):
+        for size in SIZES:
+            self.check(Encoder.atmost_one_group, size)
+
+
+
+@unittest.skipIf(sparse is None, "scipy isn't installed, no_hard_conflicts uses its loop")
+class TestTimeConflicts(unittest.TestCase):
+    def check(self, course_data):
+        pd = ProcessData(course_data)
+        pd.process_data()
+        data = pd.get_data()
+
+        times_of = {}
+        for time_id, literals in data.literals_by_time.items():
+            for literal in literals:
+                times_of.setdefault(literal, set()).add(time_id)
+        for pts, section_pairs in data.conflict_id_combinations.items():
+            encoder = Encoder(data, {}, debug=False)
+            encoder.no_hard_conflicts(section_pairs, k=1, pts_key=pts)
+            encoder.dedupe()
+            expected = {
+                tuple(sorted((-literal1, -literal2)))
+                for section1, section2 in section_pairs
+                for literal1 in data.literals_by_section[section1]
+                for literal2 in data.literals_by_section[section2]
+                if any(other in data.time_conflict_ids[time_id]
+                       for time_id in times_of[literal1] for other in times_of[literal2])}
+            self.assertEqual(set(encoder.clauses[None]), expected, pts)
+
+    def test_cs(self):
+        self.check(load_dataset("cs"))
+
+    def test_only_overlapping_pairs(self):
+        # M0800+170 overlaps both of the other times, M0800+50 and M0900+50 still don't clash
+        self.check({
+            "A": {"room_times": {("R1", "M0800+50", 0), ("R1", "M0800+170", 0)}, "hard": {"B"}, "soft": {}},
+            "B": {"room_times": {("R2", "M0900+50", 0)}, "hard": set(), "soft": {}},
+        })
+
+
+if __name__ == "__main__":
+    unittest.main()